@@ -2,7 +2,6 @@
 """ """
 
 import copy
-import html
 from collections import OrderedDict
 from pathlib import Path
 
@@ -10,10 +9,11 @@ import notodata.db as db
 from aksharamukha import transliterate
 from lxml import etree
 
+from udhr_corpus import canonical_path
 from yaplon import reader
 
-in_folder = Path("..", "data", "udhr")
-out_folder = Path("..", "data", "udhr-translit")
+in_folder = Path(Path(__file__).parent, "..", "data", "udhr")
+out_folder = Path(Path(__file__).parent, "..", "data", "udhr-translit")
 
 directions = {
     "[unspecified]": "ltr",
@@ -94,7 +94,7 @@ class UDHRTransliterator:
         self.init_ak()
 
     def init_ak(self):
-        with open("aksharamukha-scripts.yml") as f:
+        with open(Path(Path(__file__).parent, "aksharamukha-scripts.yml")) as f:
             self.ak_scripts_all = reader.yaml(f)
         for k, v in self.ak_scripts_all.items():
             if v["script"] not in skip_scripts:
@@ -149,10 +149,12 @@ class UDHRTransliterator:
                 self.save()
 
     def convert_el(self, text, from_aks, to_aks, ak):
+        if not text:
+            return text
         return transliterate.process(
             from_aks,
             to_aks,
-            html.unescape(text.strip()),
+            text.strip(),
             nativize=ak.get("nativize", True),
             pre_options=[],
             post_options=ak["post_options"],
@@ -193,7 +195,7 @@ class UDHRTransliterator:
     def open(self, in_file_name):
         self.in_path = Path(in_folder, in_file_name)
         parser = etree.XMLParser(ns_clean=True)
-        with open(self.in_path, encoding="utf-8") as f:
+        with open(canonical_path(self.in_path), encoding="utf-8") as f:
             self.oldtree = etree.parse(f, parser)
         self.oldroot = self.oldtree.getroot()
         self.xml_lang_base = self.oldroot.attrib[
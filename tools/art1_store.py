@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Versioned store for the merged Article 1 dataset.
+
+Instead of a full YAML snapshot per processing step, the store keeps one base
+snapshot plus one delta per step in `merged/store/`. Records are identified by
+the text fingerprint from `merge_art1.py`; a delta lists, per record, the
+fields that were set or removed, or null if the record was dropped.
+
+The store replaces the snapshots of the steps up to omniglot5, which no tool
+reads any more; `checkout` writes any of them again (the original Omniglot
+dump in the text-keyed layout, with its key in "name_omniglot"). The
+snapshots of omniglot6 to omniglot8 stay in `merged/` as working files:
+`update_langnames_in_merged.py` reads omniglot6 and writes omniglot7, which
+`near_duplicates.py`, `udhr_bundle.py` and `merged/test.py` read.
+
+    python art1_store.py import                 # build from SNAPSHOTS
+    python art1_store.py commit new.yaml step9  # add a version
+    python art1_store.py checkout step9 out.yaml
+    python art1_store.py diff omniglot6 omniglot7
+    python art1_store.py blame omniglot7 "Tous les êtres humains..."
+"""
+
+import argparse
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+import yaml
+
+from merge_art1 import fingerprint, iter_yaml_items
+from yaplon import writer
+
+try:
+    _Loader = yaml.CSafeLoader
+except AttributeError:
+    _Loader = yaml.SafeLoader
+
+merged_folder = Path(Path(__file__).parent, "..", "merged")
+store_folder = Path(merged_folder, "store")
+
+VERSIONS_YAML = "versions.yaml"
+BASE_YAML = "base.yaml"
+DELTAS_FOLDER = "deltas"
+
+# The snapshots the store was imported from, oldest first; only the last
+# three are still files in `merged/`. The original Omniglot dump is keyed on
+# the Omniglot language name and carries the text in "udhr".
+SNAPSHOTS = [
+    {
+        "name": "omniglot-orig",
+        "path": Path(merged_folder, "udhr-art1-omniglot-orig.yaml"),
+        "text_field": "udhr",
+        "key_field": "name_omniglot",
+    },
+    {"name": "omniglot", "path": Path(merged_folder, "udhr-art1-omniglot.yaml")},
+] + [
+    {"name": f"omniglot{i}", "path": Path(merged_folder, f"udhr-art1-omniglot{i}.yaml")}
+    for i in range(2, 9)
+]
+
+
+def read_snapshot(path, text_field=None, key_field=None):
+    """Reads a snapshot YAML into an id -> record mapping. Each record holds
+    its text in "text". Records whose texts share a fingerprint get the ids
+    `fp`, `fp~1`, `fp~2`... in file order, so nothing is lost."""
+    records = OrderedDict()
+    for key, value in iter_yaml_items(path):
+        rec = OrderedDict(value or {})
+        if text_field:
+            text = rec.pop(text_field, None)
+            if not text:
+                continue
+            rec[key_field] = key
+        else:
+            text = key
+        rec_id = fingerprint(text)
+        n = 0
+        while rec_id in records:
+            n += 1
+            rec_id = f"{fingerprint(text)}~{n}"
+        rec["text"] = str(text)
+        records[rec_id] = rec
+    return records
+
+
+def make_delta(old, new):
+    """Returns the delta that turns the records old into the records new."""
+    delta = OrderedDict()
+    for rec_id, rec in new.items():
+        old_rec = old.get(rec_id, {})
+        changes = OrderedDict()
+        set_fields = OrderedDict(
+            (field, value)
+            for field, value in rec.items()
+            if field not in old_rec or old_rec[field] != value
+        )
+        unset_fields = [field for field in old_rec if field not in rec]
+        if set_fields:
+            changes["set"] = set_fields
+        if unset_fields:
+            changes["unset"] = unset_fields
+        if changes:
+            delta[rec_id] = changes
+    for rec_id in old:
+        if rec_id not in new:
+            delta[rec_id] = None
+    return delta
+
+
+def apply_delta(records, delta, provenance=None, version=None):
+    """Applies delta to records in place. If provenance is given, it is updated
+    to map each changed (id, field) to version."""
+    for rec_id, changes in delta.items():
+        if changes is None:
+            records.pop(rec_id, None)
+            if provenance is not None:
+                provenance.pop(rec_id, None)
+            continue
+        rec = records.setdefault(rec_id, OrderedDict())
+        for field in changes.get("unset", ()):
+            rec.pop(field, None)
+        rec.update(changes.get("set", {}))
+        if provenance is not None:
+            prov = provenance.setdefault(rec_id, {})
+            for field in changes.get("unset", ()):
+                prov.pop(field, None)
+            for field in changes.get("set", {}):
+                prov[field] = version
+
+
+def diff_records(old, new):
+    """Returns {"added": [...], "removed": [...], "changed": {id: {field:
+    (old, new)}}} between two materialized versions."""
+    changed = OrderedDict()
+    for rec_id, rec in new.items():
+        if rec_id not in old:
+            continue
+        fields = OrderedDict()
+        for field in sorted(set(rec) | set(old[rec_id])):
+            if rec.get(field) != old[rec_id].get(field):
+                fields[field] = (old[rec_id].get(field), rec.get(field))
+        if fields:
+            changed[rec_id] = fields
+    return {
+        "added": [rec_id for rec_id in new if rec_id not in old],
+        "removed": [rec_id for rec_id in old if rec_id not in new],
+        "changed": changed,
+    }
+
+
+def to_text_keyed(records):
+    """Returns records in the text-keyed layout of the `merged/` snapshots."""
+    out = OrderedDict()
+    for rec in records.values():
+        rec = OrderedDict(rec)
+        out[rec.pop("text")] = rec
+    return OrderedDict(sorted(out.items()))
+
+
+def read_version(version, folder=store_folder):
+    """Returns a version of the store in the text-keyed layout of the
+    `merged/` snapshots."""
+    return to_text_keyed(Art1Store(folder).materialize(version))
+
+
+class Art1Store:
+    def __init__(self, folder=store_folder):
+        self.folder = Path(folder)
+        self.versions = []
+        if Path(self.folder, VERSIONS_YAML).exists():
+            self.versions = self._load(VERSIONS_YAML) or []
+        self._cache_index = -1
+        self._cache = None
+        self._cache_provenance = None
+
+    def _load(self, name):
+        with open(Path(self.folder, name), encoding="utf-8") as f:
+            return yaml.load(f, Loader=_Loader)
+
+    def _dump(self, obj, name):
+        path = Path(self.folder, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            writer.yaml(obj, f, mini=False)
+
+    def index(self, version):
+        """Returns the position of a version given by name or number."""
+        for i, v in enumerate(self.versions):
+            if v["name"] == version:
+                return i
+        try:
+            i = int(version)
+        except (TypeError, ValueError):
+            raise KeyError(f"Unknown version: {version}")
+        if not -len(self.versions) <= i < len(self.versions):
+            raise KeyError(f"Unknown version: {version}")
+        return i % len(self.versions)
+
+    def materialize(self, version=-1, with_provenance=False):
+        """Returns the records of a version, and with with_provenance also a
+        mapping of id -> field -> name of the version that last set it.
+        Walking forward from the last materialized version only applies the
+        deltas in between."""
+        target = self.index(version)
+        if self._cache is None or target < self._cache_index:
+            self._cache = OrderedDict(
+                (rec_id, OrderedDict(rec))
+                for rec_id, rec in (self._load(BASE_YAML) or {}).items()
+            )
+            base_name = self.versions[0]["name"]
+            self._cache_provenance = {
+                rec_id: {field: base_name for field in rec}
+                for rec_id, rec in self._cache.items()
+            }
+            self._cache_index = 0
+        for i in range(self._cache_index + 1, target + 1):
+            v = self.versions[i]
+            apply_delta(
+                self._cache,
+                self._load(v["delta"]) or {},
+                self._cache_provenance,
+                v["name"],
+            )
+        self._cache_index = target
+        records = OrderedDict(
+            (rec_id, OrderedDict(rec)) for rec_id, rec in self._cache.items()
+        )
+        if with_provenance:
+            provenance = {
+                rec_id: dict(prov) for rec_id, prov in self._cache_provenance.items()
+            }
+            return records, provenance
+        return records
+
+    def commit(self, records, name, source=""):
+        """Adds records as a new version named name."""
+        if any(v["name"] == name for v in self.versions):
+            raise ValueError(f"Version already exists: {name}")
+        version = OrderedDict([("name", name), ("source", str(source))])
+        if not self.versions:
+            self._dump(records, BASE_YAML)
+            version["delta"] = None
+        else:
+            delta = make_delta(self.materialize(-1), records)
+            version["delta"] = f"{DELTAS_FOLDER}/{len(self.versions):02d}-{name}.yaml"
+            self._dump(delta, version["delta"])
+        version["records"] = len(records)
+        self.versions.append(version)
+        self._dump(self.versions, VERSIONS_YAML)
+        self._cache_index = -1
+        self._cache = None
+        return version
+
+    def diff(self, old_version, new_version):
+        return diff_records(
+            self.materialize(old_version), self.materialize(new_version)
+        )
+
+    def blame(self, version, text):
+        """Returns [(id, record, provenance)] of the records whose text has
+        the same fingerprint as text, including those stored as duplicates
+        (`fp~1`, `fp~2`...)."""
+        records, provenance = self.materialize(version, with_provenance=True)
+        fp = fingerprint(text)
+        return [
+            (rec_id, rec, provenance[rec_id])
+            for rec_id, rec in records.items()
+            if rec_id == fp or rec_id.startswith(f"{fp}~")
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default=str(store_folder))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="build the store from the merged/ snapshots")
+    p = sub.add_parser("commit", help="add a text-keyed YAML file as a version")
+    p.add_argument("path")
+    p.add_argument("name")
+    p = sub.add_parser("checkout", help="write a version as text-keyed YAML")
+    p.add_argument("version")
+    p.add_argument("output")
+    p = sub.add_parser("diff", help="list changes between two versions")
+    p.add_argument("old")
+    p.add_argument("new")
+    p = sub.add_parser("blame", help="show which version set each field")
+    p.add_argument("version")
+    p.add_argument("text")
+    sub.add_parser("log", help="list versions")
+    args = parser.parse_args()
+
+    store = Art1Store(args.store)
+    if args.command == "import":
+        if store.versions:
+            sys.exit(f"Store in {args.store} is not empty")
+        missing = [str(s["path"]) for s in SNAPSHOTS if not s["path"].exists()]
+        if missing:
+            sys.exit(f"Missing snapshots: {', '.join(missing)}")
+        for snapshot in SNAPSHOTS:
+            records = read_snapshot(
+                snapshot["path"],
+                snapshot.get("text_field"),
+                snapshot.get("key_field"),
+            )
+            v = store.commit(records, snapshot["name"], snapshot["path"].name)
+            print(v["name"], v["records"])
+    elif args.command == "commit":
+        v = store.commit(read_snapshot(args.path), args.name, args.path)
+        print(v["name"], v["records"])
+    elif args.command == "checkout":
+        records = to_text_keyed(store.materialize(args.version))
+        with open(args.output, "w", encoding="utf-8") as f:
+            writer.yaml(records, f, mini=False)
+    elif args.command == "diff":
+        old = store.materialize(args.old)
+        new = store.materialize(args.new)
+        result = diff_records(old, new)
+        for rec_id in result["added"]:
+            print(f"+ {rec_id} {new[rec_id]['text'][:60]}")
+        for rec_id in result["removed"]:
+            print(f"- {rec_id} {old[rec_id]['text'][:60]}")
+        for rec_id, fields in result["changed"].items():
+            print(f"~ {rec_id} {new[rec_id]['text'][:60]}")
+            for field, (a, b) in fields.items():
+                print(f"    {field}: {a!r} -> {b!r}")
+    elif args.command == "blame":
+        matches = store.blame(args.version, args.text)
+        if not matches:
+            sys.exit("No record with this text")
+        for rec_id, rec, prov in matches:
+            print(rec_id)
+            for field, value in rec.items():
+                print(f"{prov.get(field, '?'):>16}  {field}: {value}")
+    elif args.command == "log":
+        for i, v in enumerate(store.versions):
+            print(i, v["name"], v["records"], v["source"])
+
+
+if __name__ == "__main__":
+    main()
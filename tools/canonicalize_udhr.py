@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Writes canonical copies of the corpus documents.
+
+The official XML stores much of its text as numeric character references
+(`Declara&#x00E7;&#x00F3;n`). The canonical copy of a document has the same
+elements, attributes and text, but in NFC, written as literal UTF-8 and
+without the indentation between structural elements, so it is smaller and
+faster to parse. Copies go to `build/canonical/FOLDER/udhr_KEY.xml`; each copy
+is checked to parse back to a tree equivalent to its source before it is
+kept. `udhr_corpus.iter_paragraphs()` and the other readers use a copy when it
+is not older than its source.
+
+Documents that do not parse or whose copy does not round-trip are skipped
+and reported; the readers then use the source. The exit status is 1 for
+them only with `--strict`.
+
+    python canonicalize_udhr.py          # write outdated copies
+    python canonicalize_udhr.py --check  # only verify existing copies
+"""
+
+import argparse
+import sys
+import unicodedata
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import CORPUS_FOLDERS, canonical_folder, canonical_path, data_folder
+
+# Elements whose whitespace-only text between children is indentation.
+STRUCTURAL = {
+    "udhr",
+    "preamble",
+    "recital",
+    "proclamation",
+    "article",
+    "note",
+    "orderedlist",
+    "listitem",
+}
+
+
+def _nfc(text):
+    return None if text is None else unicodedata.normalize("NFC", text)
+
+
+def _is_space(text):
+    return text is not None and not text.strip()
+
+
+def canonicalize(tree):
+    """Canonicalizes tree in place and returns it."""
+    for el in tree.getroot().iter():
+        if not isinstance(el.tag, str):
+            continue
+        structural = etree.QName(el).localname in STRUCTURAL
+        if structural and len(el) and _is_space(el.text):
+            el.text = None
+        else:
+            el.text = _nfc(el.text)
+        for child in el:
+            if structural and _is_space(child.tail):
+                child.tail = None
+            else:
+                child.tail = _nfc(child.tail)
+        for name, value in el.attrib.items():
+            el.attrib[name] = _nfc(value)
+    return tree
+
+
+def _signature(el, parent_structural=False):
+    """Yields the content of el as compared by equivalent()."""
+    structural = isinstance(el.tag, str) and etree.QName(el).localname in STRUCTURAL
+    yield el.tag
+    if isinstance(el.tag, str):
+        yield sorted((k, _nfc(v)) for k, v in el.attrib.items())
+    text = el.text
+    if structural and len(el) and _is_space(text):
+        text = None
+    yield _nfc(text)
+    for child in el:
+        yield from _signature(child, structural)
+    tail = el.tail
+    if parent_structural and _is_space(tail):
+        tail = None
+    yield _nfc(tail) if el.getparent() is not None else None
+
+
+def equivalent(source_root, canonical_root):
+    """Returns True if both trees have the same elements, attributes and
+    text, up to NFC and indentation between structural elements."""
+    a = list(_signature(source_root))
+    b = list(_signature(canonical_root))
+    return a == b
+
+
+def canonical_file(path):
+    return Path(canonical_folder, path.resolve().relative_to(data_folder.resolve()))
+
+
+def write_canonical(path):
+    """Writes the canonical copy of the document at path and returns its
+    path, or raises ValueError if the copy does not round-trip."""
+    out = canonical_file(path)
+    tree = etree.parse(str(path))
+    source_root = etree.parse(str(path)).getroot()
+    canonicalize(tree)
+    data = etree.tostring(tree, encoding="UTF-8", xml_declaration=True)
+    if not equivalent(source_root, etree.fromstring(data)):
+        raise ValueError(f"{path}: canonical copy is not equivalent")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(out)
+    return out
+
+
+def corpus_files():
+    files = []
+    for folder in CORPUS_FOLDERS:
+        files += sorted(Path(data_folder, folder).glob("udhr_*.xml"))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--check", action="store_true", help="verify the existing copies only"
+    )
+    parser.add_argument("-f", "--force", action="store_true", help="rewrite all")
+    parser.add_argument(
+        "--strict", action="store_true", help="exit with 1 if a document fails"
+    )
+    args = parser.parse_args()
+
+    written = 0
+    failed = 0
+    before = 0
+    after = 0
+    for path in corpus_files():
+        try:
+            if args.check:
+                out = canonical_file(path)
+                if out.exists() and not equivalent(
+                    etree.parse(str(path)).getroot(), etree.parse(str(out)).getroot()
+                ):
+                    raise ValueError(f"{out}: not equivalent to {path}")
+                continue
+            if not args.force and canonical_path(path) != path:
+                continue
+            out = write_canonical(path)
+        except (etree.XMLSyntaxError, ValueError) as e:
+            key = path.stem[len("udhr_") :]
+            print(f"Skipping {path.parent.name}/{key}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        written += 1
+        before += path.stat().st_size
+        after += out.stat().st_size
+    if not args.check:
+        print(f"{written} copies written, {before} -> {after} bytes")
+    if failed:
+        print(f"{failed} documents skipped", file=sys.stderr)
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
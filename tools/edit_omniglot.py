@@ -4,10 +4,15 @@
 __version__ = "0.0.1"
 
 from collections import OrderedDict
+from pathlib import Path
 
 from yaplon import reader, writer
 
-with open("udhr-omniglot-codes.yaml", encoding="utf-8") as f:
+inpath = Path(Path(__file__).parent, "udhr-omniglot-codes.yaml")
+scriptspath = Path(Path(__file__).parent, "udhr_official_scripts.yaml")
+outpath = Path(Path(__file__).parent, "udhr-art1-omniglot2.yaml")
+
+with open(inpath, encoding="utf-8") as f:
     udhrs_omni = reader.yaml(f)
 
 udhrs_omni_reversed = {}
@@ -26,7 +31,7 @@ for lang_name_omni, udhr_omni in udhrs_omni.items():
     if udhr_ipa:
         u["ipa"] = udhr_ipa
 
-with open("udhr_official_scripts.yaml", encoding="utf-8") as f:
+with open(scriptspath, encoding="utf-8") as f:
     udhrs_off = reader.yaml(f)
 
 for udhr_off_key, udhr_off in udhrs_off.items():
@@ -44,5 +49,5 @@ udhrs_omni_reversed = OrderedDict(sorted(udhrs_omni_reversed.items()))
 
 print(len(udhrs_omni_reversed.keys()))
 
-with open("udhr-art1-omniglot2.yaml", "w", encoding="utf-8") as f:
+with open(outpath, "w", encoding="utf-8") as f:
     writer.yaml(udhrs_omni_reversed, f, mini=False)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Exports the whole corpus as a columnar dataset, one row per paragraph.
+
+Each row holds the translation key, its folder, the (section, article, para)
+position from `udhr_corpus.iter_paragraphs()`, the text, and the catalog
+metadata of the translation. The output, partitioned by script, is written
+as a Parquet dataset and as uncompressed Arrow IPC files, which can be opened
+zero-copy with `open_script()`:
+
+    build/corpus/parquet/iso15924=Latn/part-0.parquet
+    build/corpus/arrow/Latn.arrow
+
+Reading the export needs only pyarrow (or any Parquet/Arrow reader), not lxml.
+"""
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from lxml import etree
+
+from udhr_corpus import CORPUS_FOLDERS, iter_paragraphs, read_catalog
+
+export_folder = Path(Path(__file__).parent, "..", "build", "corpus")
+
+_dict_string = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema(
+    [
+        ("key", _dict_string),
+        ("folder", _dict_string),
+        ("section", _dict_string),
+        ("article", pa.uint8()),
+        ("para", pa.uint8()),
+        ("text", pa.string()),
+        ("iso639-3", _dict_string),
+        ("iso15924", _dict_string),
+        ("bcp47", _dict_string),
+        ("dir", _dict_string),
+        ("stage", pa.int8()),
+        ("loc", _dict_string),
+        ("name", _dict_string),
+    ]
+)
+
+
+def collect_rows(folders=CORPUS_FOLDERS):
+    """Returns the columns of all paragraphs of all documents, grouped by
+    script, as {script: {column: [values]}}."""
+    scripts = {}
+    for entry in read_catalog(folders):
+        if entry["path"] is None:
+            continue
+        try:
+            paragraphs = list(iter_paragraphs(entry["path"]))
+        except etree.XMLSyntaxError as e:
+            print(f"Skipping {entry['path'].name}: {e}", file=sys.stderr)
+            continue
+        columns = scripts.setdefault(
+            entry["iso15924"], {name: [] for name in SCHEMA.names}
+        )
+        for p in paragraphs:
+            columns["key"].append(entry["f"])
+            columns["folder"].append(entry["folder"])
+            columns["section"].append(p.section)
+            columns["article"].append(p.article)
+            columns["para"].append(p.para)
+            columns["text"].append(p.text)
+            for name in ("iso639-3", "iso15924", "bcp47", "dir", "stage", "loc"):
+                columns[name].append(entry[name])
+            columns["name"].append(entry["n"])
+    return scripts
+
+
+def to_table(columns):
+    arrays = []
+    for field in SCHEMA:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[field.name]).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def export(folder=export_folder, folders=CORPUS_FOLDERS, formats=("parquet", "arrow")):
+    folder = Path(folder)
+    scripts = collect_rows(folders)
+    tables = {script: to_table(columns) for script, columns in sorted(scripts.items())}
+    if "parquet" in formats:
+        shutil.rmtree(Path(folder, "parquet"), ignore_errors=True)
+        ds.write_dataset(
+            pa.concat_tables(tables.values()),
+            Path(folder, "parquet"),
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([("iso15924", pa.string())]), flavor="hive"
+            ),
+        )
+    if "arrow" in formats:
+        shutil.rmtree(Path(folder, "arrow"), ignore_errors=True)
+        Path(folder, "arrow").mkdir(parents=True)
+        for script, table in tables.items():
+            with pa.OSFile(str(Path(folder, "arrow", f"{script}.arrow")), "wb") as f:
+                with pa.ipc.new_file(f, SCHEMA) as w:
+                    w.write_table(table)
+    return sum(t.num_rows for t in tables.values()), len(tables)
+
+
+def open_script(script, folder=export_folder):
+    """Returns the rows of one script as a table backed by a memory map of
+    its Arrow file, without copying the data."""
+    source = pa.memory_map(str(Path(folder, "arrow", f"{script}.arrow")), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def open_dataset(folder=export_folder):
+    """Returns the Parquet export as a pyarrow dataset partitioned by script."""
+    return ds.dataset(Path(folder, "parquet"), format="parquet", partitioning="hive")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=str(export_folder))
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["parquet", "arrow"],
+        action="append",
+        help="output format, can be repeated (default: both)",
+    )
+    args = parser.parse_args()
+    rows, scripts = export(args.output, formats=args.format or ("parquet", "arrow"))
+    print(f"{rows} paragraphs in {scripts} scripts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Checks a directory of fonts against every translation of the corpus.
+
+For each font, the codepoints of its `cmap` are compared with the codepoint
+set of each translation, using the bitsets of `select_coverage.py`, which
+gives the number of codepoints of the translation the font lacks. With
+`--shape`, the Article 1 text of each translation is also shaped with
+HarfBuzz and the `.notdef` glyphs in the output are counted. Fonts are
+processed in a process pool; shaping results are cached in
+`build/shaping_cache.json` by font hash, text hash and language, so only new
+fonts or changed texts are shaped again.
+
+The result is a coverage matrix with one row per translation and one column
+per font, written as tab-separated values. A cell is the number of missing
+codepoints, or "missing/notdef" with `--shape`; 0 means full support.
+
+    python font_coverage.py ~/fonts/NotoSans
+    python font_coverage.py ~/fonts/NotoSans --shape -o coverage.tsv
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from lxml import etree
+
+from select_coverage import Coverage, popcount
+from udhr_articles import UdhrArticleIndex
+from udhr_corpus import read_catalog
+
+cache_path = Path(Path(__file__).parent, "..", "build", "shaping_cache.json")
+
+CHUNK = 32
+FONT_SUFFIXES = {".ttf", ".otf", ".ttc", ".otc", ".woff", ".woff2"}
+
+_fonts = {}
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def shaping_key(digest, language):
+    """Returns the cache key of a text hash shaped with a language."""
+    return f"{digest}/{language or ''}"
+
+
+def font_files(folder):
+    return sorted(
+        p for p in Path(folder).rglob("*") if p.suffix.lower() in FONT_SUFFIXES
+    )
+
+
+def font_cmap(path):
+    from fontTools.ttLib import TTFont
+
+    with TTFont(path, lazy=True, fontNumber=0) as font:
+        return sorted(font.getBestCmap())
+
+
+def _hb_font(path):
+    import uharfbuzz as hb
+
+    if path not in _fonts:
+        with open(path, "rb") as f:
+            face = hb.Face(hb.Blob(f.read()))
+        _fonts[path] = hb.Font(face)
+    return _fonts[path]
+
+
+def count_notdef(path, text, language=None):
+    """Returns the number of .notdef glyphs when shaping text with the font
+    at path."""
+    import uharfbuzz as hb
+
+    buf = hb.Buffer()
+    buf.add_str(text)
+    buf.guess_segment_properties()
+    if language:
+        buf.language = language
+    hb.shape(_hb_font(path), buf)
+    return sum(1 for info in buf.glyph_infos if info.codepoint == 0)
+
+
+def shape_texts(job):
+    """Worker: shapes a chunk of texts with one font; job is (font index,
+    path, [(shaping key, text, language)]). Returns (font index, {shaping
+    key: notdef count}). Fonts stay loaded in the worker between chunks."""
+    index, path, texts = job
+    return index, {skey: count_notdef(path, text, lang) for skey, text, lang in texts}
+
+
+class FontCoverage:
+    def __init__(self, coverage=None, cache=cache_path):
+        self.coverage = coverage or Coverage.load()
+        self.cache_path = Path(cache)
+        self.cache = {}
+        if self.cache_path.exists():
+            with open(self.cache_path, encoding="utf-8") as f:
+                self.cache = json.load(f)
+
+    def save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(self.cache, f, separators=(",", ":"), sort_keys=True)
+
+    def article1(self):
+        """Returns {key: (text hash, text)} of the Article 1 texts."""
+        index = UdhrArticleIndex()
+        texts = {}
+        for key in self.coverage.keys:
+            try:
+                rows = index.GetArticleParagraphs(key, 1)
+            except (KeyError, ValueError, etree.XMLSyntaxError):
+                continue
+            text = " ".join(row.text for row in rows if row.para > 0)
+            if text:
+                texts[key] = (text_hash(text), text)
+        return texts
+
+    def missing(self, cmap):
+        """Returns the number of codepoints of each translation that are not
+        in cmap, as an array aligned with the coverage keys."""
+        mask = np.packbits(np.isin(self.coverage.chars, cmap))
+        return popcount(self.coverage.bits & ~mask)
+
+    def check(self, fonts, shape=False, workers=None, languages=None):
+        """Returns (missing, notdef) matrices of shape (translations, fonts);
+        notdef is None without shape, and -1 where a text was not shaped."""
+        missing = np.zeros((len(self.coverage.keys), len(fonts)), dtype=np.int32)
+        for i, path in enumerate(fonts):
+            missing[:, i] = self.missing(font_cmap(path))
+        if not shape:
+            return missing, None
+        texts = self.article1()
+        languages = languages or {}
+        hashes = [file_hash(path) for path in fonts]
+        jobs = []
+        for i, path in enumerate(fonts):
+            cached = self.cache.setdefault(hashes[i], {})
+            todo = {}
+            for key, (digest, text) in texts.items():
+                skey = shaping_key(digest, languages.get(key))
+                if skey not in cached and skey not in todo:
+                    todo[skey] = (skey, text, languages.get(key))
+            todo = list(todo.values())
+            for start in range(0, len(todo), CHUNK):
+                jobs.append((i, str(path), todo[start : start + CHUNK]))
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for i, shaped in pool.map(shape_texts, jobs):
+                    self.cache[hashes[i]].update(shaped)
+            self.save()
+        notdef = np.full(missing.shape, -1, dtype=np.int32)
+        for row, key in enumerate(self.coverage.keys):
+            if key in texts:
+                skey = shaping_key(texts[key][0], languages.get(key))
+                for i in range(len(fonts)):
+                    notdef[row, i] = self.cache[hashes[i]][skey]
+        return missing, notdef
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fonts", help="folder with font files")
+    parser.add_argument("--shape", action="store_true", help="shape Article 1")
+    parser.add_argument("-o", "--output", help="write the matrix to this file")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    fonts = font_files(args.fonts)
+    if not fonts:
+        print(f"No font files in {args.fonts}", file=sys.stderr)
+        sys.exit(1)
+    checker = FontCoverage()
+    coverage = checker.coverage
+    languages = {e["f"]: e["bcp47"] for e in read_catalog() if e["bcp47"]}
+    missing, notdef = checker.check(fonts, args.shape, args.jobs, languages)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    header = ["key", "name", "script"] + [p.name for p in fonts]
+    print("\t".join(header), file=out)
+    for row, key in enumerate(coverage.keys):
+        cells = [key, coverage.names[row], coverage.scripts[row]]
+        for i in range(len(fonts)):
+            cell = str(missing[row, i])
+            if notdef is not None:
+                cell += "/" + ("" if notdef[row, i] < 0 else str(notdef[row, i]))
+            cells.append(cell)
+        print("\t".join(cells), file=out)
+    if args.output:
+        out.close()
+    for i, path in enumerate(fonts):
+        supported = missing[:, i] == 0
+        if notdef is not None:
+            supported &= notdef[:, i] <= 0
+        print(
+            f"{path.name}: {int(supported.sum())} of {len(coverage.keys)} "
+            f"translations supported",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
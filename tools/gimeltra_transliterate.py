@@ -2,7 +2,6 @@
 """ """
 
 import copy
-import html
 from collections import OrderedDict
 from pathlib import Path
 
@@ -10,9 +9,10 @@ import notodata.db as db
 from lxml import etree
 
 from gimeltra import gimeltra
+from udhr_corpus import canonical_path
 
-in_folder = Path("..", "data", "udhr")
-out_folder = Path("..", "data", "udhr-translit")
+in_folder = Path(Path(__file__).parent, "..", "data", "udhr")
+out_folder = Path(Path(__file__).parent, "..", "data", "udhr-translit")
 
 directions = {
     "[unspecified]": "ltr",
@@ -110,7 +110,9 @@ class UDHRTransliterator:
             self.save()
 
     def convert_el(self, text, in_script, out_script):
-        return self.tr.tr(html.unescape(text.strip()), sc=in_script, to_sc=out_script)
+        if not text:
+            return text
+        return self.tr.tr(text.strip(), sc=in_script, to_sc=out_script)
 
     def convert_xml(self, in_script, out_script, ak):
         self.tree = copy.deepcopy(self.oldtree)
@@ -143,7 +145,7 @@ class UDHRTransliterator:
     def open(self, in_file_name):
         self.in_path = Path(in_folder, in_file_name)
         parser = etree.XMLParser(ns_clean=True)
-        with open(self.in_path, encoding="utf-8") as f:
+        with open(canonical_path(self.in_path), encoding="utf-8") as f:
             self.oldtree = etree.parse(f, parser)
         self.oldroot = self.oldtree.getroot()
         self.xml_lang_base = self.oldroot.attrib[
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Identifies the language and script of a text from character n-grams.
+
+The model is trained from the local corpus: the text of all translations of
+one (language, script) pair is counted into character 1- to 3-grams, and the
+`TOP_NGRAMS` most frequent n-grams of each pair are kept with their log
+probabilities. The weights are stored as a sparse matrix in compressed
+sparse column form (one column per n-gram), so a batch of texts is scored
+by gathering only the columns of the n-grams it contains, as one vectorized
+multiply-add for the whole batch. N-grams a pair has not kept count with
+the pair's additive smoothing floor. The model is saved to `build/langid.npz`
+with a hash of the size and mtime of every `index.xml` and document it was
+trained on, and is retrained when that state no longer matches the corpus.
+
+Results are ranked BCP 47 tags with the script made explicit (`en-Latn`) and
+a confidence that is a softmax of the mean log probability per n-gram.
+
+    python identify_language.py "Alle Menschen sind frei und gleich"
+    python identify_language.py --check ../merged/udhr-art1-omniglot7.yaml
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+
+import numpy as np
+from lxml import etree
+
+from udhr_corpus import (
+    CORPUS_FOLDERS,
+    INDEX_XML,
+    data_folder,
+    iter_paragraphs,
+    read_catalog,
+)
+
+model_path = Path(Path(__file__).parent, "..", "build", "langid.npz")
+
+NGRAMS = (1, 2, 3)
+TOP_NGRAMS = 600
+SHARPNESS = 20.0
+SMOOTHING = 0.1
+SCRIPT_SUBTAG_RE = re.compile(r"^[A-Z][a-z]{3}$")
+
+
+def language_tag(entry):
+    """Returns the BCP 47 tag of a catalog entry with an explicit script."""
+    tag = entry["bcp47"] or entry["iso639-3"]
+    subtags = tag.split("-")
+    if entry["iso15924"] and not any(SCRIPT_SUBTAG_RE.match(s) for s in subtags):
+        subtags.insert(1, entry["iso15924"])
+    return "-".join(subtags)
+
+
+def corpus_state(catalog):
+    """Returns a hash of the size and mtime of the index.xml files and the
+    documents of the catalog."""
+    paths = [Path(data_folder, folder, INDEX_XML) for folder in CORPUS_FOLDERS]
+    paths += [entry["path"] for entry in catalog if entry["path"] is not None]
+    state = hashlib.sha1()
+    for path in paths:
+        if path.exists():
+            st = path.stat()
+            state.update(f"{path.name}\t{st.st_size}\t{st.st_mtime_ns}\n".encode())
+    return state.hexdigest()
+
+
+def ngrams(text):
+    """Yields the character n-grams of the normalized text."""
+    text = " " + " ".join(unicodedata.normalize("NFC", text).casefold().split()) + " "
+    for n in NGRAMS:
+        for i in range(len(text) - n + 1):
+            yield text[i : i + n]
+
+
+class LanguageIdentifier:
+    FIELDS = ["labels", "vocabulary", "indptr", "indices", "data", "floors"]
+
+    def __init__(self, labels, vocabulary, indptr, indices, data, floors, corpus=""):
+        self.labels = list(labels)
+        self.vocabulary = list(vocabulary)
+        self.index = {ngram: i for i, ngram in enumerate(self.vocabulary)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.floors = np.asarray(floors, dtype=np.float32)
+        self.corpus = str(corpus)
+
+    @classmethod
+    def train(cls, catalog=None, top=TOP_NGRAMS):
+        """Returns a model trained on the documents of the catalog."""
+        catalog = list(catalog if catalog is not None else read_catalog())
+        counts = defaultdict(Counter)
+        for entry in catalog:
+            if entry["path"] is None:
+                continue
+            try:
+                for row in iter_paragraphs(entry["path"]):
+                    counts[language_tag(entry)].update(ngrams(row.text))
+            except etree.XMLSyntaxError as e:
+                print(f"Skipping {entry['path']}: {e}", file=sys.stderr)
+        labels = sorted(counts)
+        seen = len(set().union(*counts.values()))
+        vocabulary = OrderedDict()
+        columns = defaultdict(list)
+        floors = []
+        for row, label in enumerate(labels):
+            counter = counts[label]
+            # Additive smoothing over all n-grams seen in the corpus.
+            total = sum(counter.values()) + SMOOTHING * seen
+            floor = np.log(SMOOTHING / total)
+            floors.append(floor)
+            for ngram, count in counter.most_common(top):
+                col = vocabulary.setdefault(ngram, len(vocabulary))
+                columns[col].append((row, np.log((count + SMOOTHING) / total) - floor))
+        indptr = [0]
+        indices = []
+        data = []
+        for col in range(len(vocabulary)):
+            for row, value in columns[col]:
+                indices.append(row)
+                data.append(value)
+            indptr.append(len(indices))
+        return cls(
+            labels,
+            list(vocabulary),
+            indptr,
+            indices,
+            data,
+            floors,
+            corpus_state(catalog),
+        )
+
+    @classmethod
+    def load(cls, path=model_path, retrain=False, log=print):
+        """Returns the stored model, retraining and saving it if it is
+        missing or was trained on a different state of the corpus."""
+        path = Path(path)
+        catalog = read_catalog()
+        if not retrain and path.exists():
+            with np.load(path) as data:
+                corpus = str(data["corpus"]) if "corpus" in data.files else ""
+                if corpus == corpus_state(catalog):
+                    return cls(*(data[name] for name in cls.FIELDS), corpus)
+        model = cls.train(catalog)
+        model.save(path)
+        log(f"{len(model.labels)} labels, {len(model.vocabulary)} n-grams")
+        return model
+
+    def save(self, path=model_path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                corpus=np.array(self.corpus),
+                **{name: np.asarray(getattr(self, name)) for name in self.FIELDS},
+            )
+
+    def scores(self, texts):
+        """Returns a (texts, labels) matrix of mean log probabilities per
+        n-gram."""
+        docs = []
+        features = []
+        totals = np.zeros(len(texts), dtype=np.float32)
+        for d, text in enumerate(texts):
+            for ngram in ngrams(text):
+                totals[d] += 1
+                col = self.index.get(ngram)
+                if col is not None:
+                    docs.append(d)
+                    features.append(col)
+        n_labels = len(self.labels)
+        keys = np.asarray(docs, dtype=np.int64) * len(self.vocabulary)
+        keys += np.asarray(features, dtype=np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        doc, col = np.divmod(keys, len(self.vocabulary))
+        # Gather the nonzeros of every (doc, column) pair in one pass.
+        starts = self.indptr[col]
+        lengths = self.indptr[col + 1] - starts
+        first = np.cumsum(lengths) - lengths
+        pos = np.arange(lengths.sum()) - np.repeat(first - starts, lengths)
+        weights = self.data[pos] * np.repeat(counts, lengths)
+        flat = np.repeat(doc, lengths) * n_labels + self.indices[pos]
+        scores = np.bincount(flat, weights=weights, minlength=len(texts) * n_labels)
+        scores = scores.reshape(len(texts), n_labels)
+        scores += totals[:, None] * self.floors[None, :]
+        return scores / np.maximum(totals, 1)[:, None]
+
+    def classify(self, texts, top=3):
+        """Returns, for each text, the top [(tag, confidence)] candidates."""
+        if not texts:
+            return []
+        scores = self.scores(texts) * SHARPNESS
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = np.argsort(-probs, axis=1)[:, :top]
+        return [
+            [(self.labels[i], float(probs[d, i])) for i in row]
+            for d, row in enumerate(best)
+        ]
+
+
+def language_of(tag):
+    return tag.split("-")[0].lower()
+
+
+def check_records(model, path, top=3):
+    """Yields (text, code, candidates) for the records of a text-keyed YAML
+    file whose language is not among the top candidates."""
+    from merge_art1 import iter_yaml_items
+
+    records = [(text, rec or {}) for text, rec in iter_yaml_items(path)]
+    results = model.classify([str(text) for text, _ in records], top)
+    for (text, rec), candidates in zip(records, results):
+        code = rec.get("lang_full") or rec.get("lang")
+        if not code:
+            continue
+        if language_of(code) not in {language_of(tag) for tag, _ in candidates}:
+            yield text, code, candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("texts", nargs="*")
+    parser.add_argument("--train", action="store_true", help="retrain the model")
+    parser.add_argument("--check", help="text-keyed YAML file to verify")
+    parser.add_argument("-n", "--top", type=int, default=3)
+    args = parser.parse_args()
+
+    model = LanguageIdentifier.load(retrain=args.train)
+    if args.check:
+        for text, code, candidates in check_records(model, args.check, args.top):
+            found = ", ".join(f"{tag} {p:.2f}" for tag, p in candidates)
+            print(f"{code}\t{found}\t{str(text)[:60]}")
+    texts = args.texts
+    if not texts and not args.check and not args.train and not sys.stdin.isatty():
+        texts = [line.rstrip("\n") for line in sys.stdin]
+    for text, candidates in zip(texts, model.classify(texts, args.top)):
+        print("\t".join(f"{tag} {p:.2f}" for tag, p in candidates))
+
+
+if __name__ == "__main__":
+    main()
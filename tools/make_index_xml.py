@@ -6,10 +6,18 @@ from pathlib import Path
 
 from lxml import etree
 
+from udhr_corpus import canonical_path
+
 in_folder = Path(Path(__file__).parent, "..", "data", "udhr-manual")
 out_folder = Path(Path(__file__).parent, "..", "data", "udhr-manual")
 
 
+def index_record(at):
+    """Returns the `index.xml` row for the root attributes of a document."""
+    return f"""
+  <udhr f='{at["key"]}' iso639-3='{at["iso639-3"]}' iso15924='{at["iso15924"]}'  bcp47='{at["{http://www.w3.org/XML/1998/namespace}lang"]}'   dir='{at["dir"]}' ohchr=''  stage='4' notes='n' loc=''       demo='y' n='{at["n"]}'/>"""
+
+
 class UDHRIndexer:
     def __init__(self):
         self.in_path = None
@@ -38,13 +46,10 @@ class UDHRIndexer:
     def open(self, in_file_name):
         self.in_path = Path(in_folder, in_file_name)
         parser = etree.XMLParser(ns_clean=True)
-        with open(self.in_path, encoding="utf-8") as f:
+        with open(canonical_path(self.in_path), encoding="utf-8") as f:
             self.tree = etree.parse(f, parser)
         self.root = self.tree.getroot()
-        at = self.root.attrib
-        index_rec = f"""
-  <udhr f='{at["key"]}' iso639-3='{at["iso639-3"]}' iso15924='{at["iso15924"]}'  bcp47='{at["{http://www.w3.org/XML/1998/namespace}lang"]}'   dir='{at["dir"]}' ohchr=''  stage='4' notes='n' loc=''       demo='y' n='{at["n"]}'/>"""
-        self.index.append(index_rec)
+        self.index.append(index_record(self.root.attrib))
 
 
 def main():
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Compiles the corpus and the status files into one SQLite database.
+
+Tables:
+
+    translations  one row per catalog entry of data/udhr, data/udhr-manual and
+                  data/udhr-translit, with the document title if parsed
+    articles      the preamble, articles and notes of each document
+    paragraphs    the paragraphs of each article, with full-text search
+                  through the FTS5 table paragraphs_fts
+    status        the status text of data/status/status_KEY.xml
+    history       the history entries of the status files, oldest first, with
+                  the date as written and as YYYY-MM-DD and the stage
+                  transition (parsed by udhr_status.parse_status_file())
+    files         the hash of every file that was loaded
+
+Running the tool again only reloads the files whose hash changed, and drops
+the rows of files that were removed. The database uses WAL mode, so readers
+are not blocked while it is updated.
+
+    SELECT t.key, p.text FROM paragraphs_fts
+    JOIN paragraphs p ON p.id = paragraphs_fts.rowid
+    JOIN articles a ON a.id = p.article_id
+    JOIN translations t ON t.id = a.translation_id
+    WHERE paragraphs_fts MATCH 'dignity' AND t.stage >= 4;
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import data_folder, iter_paragraphs, read_catalog
+from udhr_status import parse_status_file, status_files
+
+db_path = Path(Path(__file__).parent, "..", "build", "udhr.sqlite")
+
+# Stored in PRAGMA user_version; a database with another version is rebuilt.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS translations (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    iso639_3 TEXT,
+    iso15924 TEXT,
+    bcp47 TEXT,
+    dir TEXT,
+    ohchr TEXT,
+    stage INTEGER,
+    loc TEXT,
+    name TEXT,
+    path TEXT,
+    title TEXT,
+    UNIQUE (folder, key)
+);
+CREATE INDEX IF NOT EXISTS translations_key ON translations (key);
+CREATE INDEX IF NOT EXISTS translations_lang ON translations (iso639_3);
+CREATE INDEX IF NOT EXISTS translations_bcp47 ON translations (bcp47);
+CREATE INDEX IF NOT EXISTS translations_script ON translations (iso15924);
+CREATE INDEX IF NOT EXISTS translations_stage ON translations (stage);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    translation_id INTEGER NOT NULL
+        REFERENCES translations (id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_translation
+    ON articles (translation_id, section, number);
+CREATE TABLE IF NOT EXISTS paragraphs (
+    id INTEGER PRIMARY KEY,
+    article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    para INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paragraphs_article ON paragraphs (article_id, para);
+CREATE VIRTUAL TABLE IF NOT EXISTS paragraphs_fts USING fts5 (
+    text, content='paragraphs', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS paragraphs_ai AFTER INSERT ON paragraphs BEGIN
+    INSERT INTO paragraphs_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS paragraphs_ad AFTER DELETE ON paragraphs BEGIN
+    INSERT INTO paragraphs_fts (paragraphs_fts, rowid, text)
+    VALUES ('delete', old.id, old.text);
+END;
+CREATE TABLE IF NOT EXISTS status (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL REFERENCES status (key) ON DELETE CASCADE,
+    date TEXT,
+    iso_date TEXT,
+    from_stage INTEGER,
+    to_stage INTEGER,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS history_key ON history (key);
+"""
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class UdhrDatabase:
+    def __init__(self, path=db_path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(path))
+        if self.con.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.con.close()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{path}{suffix}").unlink(missing_ok=True)
+            self.con = sqlite3.connect(str(path))
+            self.con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA foreign_keys=ON")
+        self.con.executescript(SCHEMA)
+        self.hashes = dict(self.con.execute("SELECT path, hash FROM files"))
+        self.loaded = 0
+
+    def _rel(self, path):
+        return Path(path).resolve().relative_to(data_folder.resolve()).as_posix()
+
+    def _changed(self, path):
+        """Returns the new hash of path if it differs from the stored one."""
+        new_hash = file_hash(path)
+        if self.hashes.get(self._rel(path)) == new_hash:
+            return None
+        return new_hash
+
+    def _set_hash(self, path, new_hash):
+        self.con.execute(
+            "INSERT OR REPLACE INTO files (path, hash) VALUES (?, ?)",
+            (self._rel(path), new_hash),
+        )
+        self.loaded += 1
+
+    def update_translations(self):
+        entries = read_catalog()
+        for entry in entries:
+            self.con.execute(
+                """INSERT INTO translations
+                (key, folder, iso639_3, iso15924, bcp47, dir, ohchr, stage, loc,
+                 name, path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (folder, key) DO UPDATE SET
+                iso639_3 = excluded.iso639_3, iso15924 = excluded.iso15924,
+                bcp47 = excluded.bcp47, dir = excluded.dir,
+                ohchr = excluded.ohchr, stage = excluded.stage,
+                loc = excluded.loc, name = excluded.name, path = excluded.path""",
+                (
+                    entry["f"],
+                    entry["folder"],
+                    entry["iso639-3"],
+                    entry["iso15924"],
+                    entry["bcp47"],
+                    entry["dir"],
+                    entry["ohchr"],
+                    entry["stage"],
+                    entry["loc"],
+                    entry["n"],
+                    self._rel(entry["path"]) if entry["path"] else None,
+                ),
+            )
+        keep = {(e["folder"], e["f"]) for e in entries}
+        for tid, folder, key, rel in list(
+            self.con.execute("SELECT id, folder, key, path FROM translations")
+        ):
+            if (folder, key) not in keep:
+                self.con.execute("DELETE FROM translations WHERE id = ?", (tid,))
+                self.con.execute("DELETE FROM files WHERE path = ?", (rel,))
+                self.hashes.pop(rel, None)
+        return entries
+
+    def load_document(self, translation_id, path):
+        self.con.execute(
+            "DELETE FROM articles WHERE translation_id = ?", (translation_id,)
+        )
+        articles = {}
+        for p in iter_paragraphs(path):
+            if p.section == "title":
+                self.con.execute(
+                    "UPDATE translations SET title = ? WHERE id = ?",
+                    (p.text, translation_id),
+                )
+                continue
+            article_id = articles.get((p.section, p.article))
+            if article_id is None:
+                article_id = self.con.execute(
+                    """INSERT INTO articles (translation_id, section, number)
+                    VALUES (?, ?, ?)""",
+                    (translation_id, p.section, p.article),
+                ).lastrowid
+                articles[(p.section, p.article)] = article_id
+            if p.para == 0:
+                self.con.execute(
+                    "UPDATE articles SET title = ? WHERE id = ?", (p.text, article_id)
+                )
+            else:
+                self.con.execute(
+                    "INSERT INTO paragraphs (article_id, para, text) VALUES (?, ?, ?)",
+                    (article_id, p.para, p.text),
+                )
+
+    def update_documents(self):
+        rows = self.con.execute(
+            "SELECT id, path FROM translations WHERE path IS NOT NULL"
+        ).fetchall()
+        for translation_id, rel in rows:
+            path = Path(data_folder, rel)
+            new_hash = self._changed(path)
+            if not new_hash:
+                continue
+            try:
+                self.load_document(translation_id, path)
+            except etree.XMLSyntaxError as e:
+                print(f"Skipping {rel}: {e}", file=sys.stderr)
+                self.con.execute(
+                    "DELETE FROM articles WHERE translation_id = ?", (translation_id,)
+                )
+            self._set_hash(path, new_hash)
+
+    def update_status(self):
+        files = status_files()
+        for key, path in files.items():
+            new_hash = self._changed(path)
+            if not new_hash:
+                continue
+            status = parse_status_file(path)
+            self.con.execute("DELETE FROM status WHERE key = ?", (key,))
+            self.con.execute(
+                "INSERT INTO status (key, path, text) VALUES (?, ?, ?)",
+                (key, self._rel(path), status["status"]),
+            )
+            self.con.executemany(
+                """INSERT INTO history
+                (key, date, iso_date, from_stage, to_stage, text)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (key, raw, date, from_stage, to_stage, text)
+                    for date, raw, from_stage, to_stage, text in status["entries"]
+                ],
+            )
+            self._set_hash(path, new_hash)
+        for (key,) in self.con.execute("SELECT key FROM status").fetchall():
+            if key not in files:
+                self.con.execute("DELETE FROM status WHERE key = ?", (key,))
+
+    def prune_files(self):
+        for rel in list(self.hashes):
+            if not Path(data_folder, rel).exists():
+                self.con.execute("DELETE FROM files WHERE path = ?", (rel,))
+
+    def update(self):
+        with self.con:
+            self.update_translations()
+            self.update_documents()
+            self.update_status()
+            self.prune_files()
+        self.con.execute("PRAGMA optimize")
+        return self.loaded
+
+    def close(self):
+        self.con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=str(db_path))
+    args = parser.parse_args()
+    db = UdhrDatabase(args.output)
+    print(f"{db.update()} files loaded into {args.output}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Merges Article 1 texts from several YAML sources into one record set.
+
+Records are keyed on a fingerprint of the normalized text (NFC, collapsed
+whitespace, no trailing punctuation, optionally no punctuation at all), so
+texts that only differ in encoding details end up in the same record. Every
+source is streamed entry by entry into a hash index, which makes the merge
+linear in the number of input records. Merging the output again with the same
+sources yields the same output.
+
+Fields that two sources disagree on are kept from the source listed first and
+reported as conflicts.
+"""
+
+import argparse
+import hashlib
+import sys
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import yaml
+
+from yaplon import writer
+
+tools_folder = Path(__file__).parent
+outpath = Path(tools_folder, "..", "merged", "udhr-art1-merged.yaml")
+conflictspath = Path(tools_folder, "..", "merged", "udhr-art1-conflicts.yaml")
+
+# Sources in order of precedence. Sources without "text_field" are keyed on the
+# Article 1 text, the others are keyed on a language and carry the text in
+# "text_field"; their key is stored in "key_field".
+SOURCES = [
+    {
+        "path": Path(tools_folder, "udhr_art1_r12a.yaml"),
+        "source": "https://r12a.github.io/",
+    },
+    {
+        "path": Path(tools_folder, "udhr_art1_official.yaml"),
+        "source": "https://unicode.org/udhr/",
+    },
+    {
+        "path": Path(tools_folder, "udhr_art1_aksharamukha.yaml"),
+        "source": "https://aksharamukha.appspot.com/",
+    },
+    {
+        "path": Path(tools_folder, "udhr-omniglot-codes.yaml"),
+        "source": "https://omniglot.com/udhr/",
+        "text_field": "udhr",
+        "key_field": "lang",
+    },
+]
+
+
+def normalize_text(text, ignore_punctuation=False):
+    """Returns the NFC form of text with whitespace collapsed and trailing
+    punctuation and format characters removed. With ignore_punctuation, all
+    punctuation is removed."""
+    text = unicodedata.normalize("NFC", str(text))
+    if ignore_punctuation:
+        text = "".join(c for c in text if not unicodedata.category(c).startswith("P"))
+    text = " ".join(text.split())
+    end = len(text)
+    while end and (
+        unicodedata.category(text[end - 1]) in ("Cf", "Zs")
+        or unicodedata.category(text[end - 1]).startswith("P")
+    ):
+        end -= 1
+    return text[:end]
+
+
+def fingerprint(text, ignore_punctuation=False):
+    """Returns a hex digest identifying the normalized form of text."""
+    norm = normalize_text(text, ignore_punctuation)
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class _OrderedSafeLoader(yaml.SafeLoader):
+    pass
+
+
+def _construct_mapping(loader, node):
+    loader.flatten_mapping(node)
+    return OrderedDict(loader.construct_pairs(node))
+
+
+_OrderedSafeLoader.add_constructor(
+    yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _construct_mapping
+)
+
+
+def iter_yaml_items(path):
+    """Yields the (key, value) pairs of a top-level YAML mapping one by one,
+    without loading the whole document."""
+    with open(path, encoding="utf-8") as f:
+        loader = _OrderedSafeLoader(f)
+        try:
+            loader.get_event()
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()
+            if not loader.check_event(yaml.MappingStartEvent):
+                raise ValueError(f"{path}: top level is not a mapping")
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = loader.construct_document(loader.compose_node(None, None))
+                value = loader.construct_document(loader.compose_node(None, None))
+                yield key, value
+        finally:
+            loader.dispose()
+
+
+def iter_source_records(source):
+    """Yields (text, record) pairs of a source described in SOURCES."""
+    text_field = source.get("text_field", None)
+    for key, value in iter_yaml_items(source["path"]):
+        rec = OrderedDict(value or {})
+        if text_field:
+            text = rec.pop(text_field, None)
+            if not text:
+                continue
+            rec[source.get("key_field", "key")] = key
+        else:
+            text = key
+        rec.setdefault("source", source["source"])
+        yield str(text), rec
+
+
+class Art1Merger:
+    def __init__(self, ignore_punctuation=False):
+        self.ignore_punctuation = ignore_punctuation
+        self.records = OrderedDict()
+        self.texts = {}
+        self.origins = {}
+        self.conflicts = []
+
+    def add(self, text, rec, origin):
+        fp = fingerprint(text, self.ignore_punctuation)
+        if fp not in self.records:
+            self.records[fp] = OrderedDict()
+            self.texts[fp] = " ".join(unicodedata.normalize("NFC", text).split())
+            self.origins[fp] = {}
+        merged = self.records[fp]
+        origins = self.origins[fp]
+        for field, value in rec.items():
+            if field not in merged:
+                merged[field] = value
+                origins[field] = origin
+            elif merged[field] != value and field != "source":
+                self.conflicts.append(
+                    OrderedDict(
+                        [
+                            ("text", self.texts[fp]),
+                            ("field", field),
+                            ("kept", merged[field]),
+                            ("kept_from", origins[field]),
+                            ("dropped", value),
+                            ("dropped_from", origin),
+                        ]
+                    )
+                )
+        return fp
+
+    def add_source(self, source):
+        origin = str(source.get("name", Path(source["path"]).name))
+        count = 0
+        for text, rec in iter_source_records(source):
+            self.add(text, rec, origin)
+            count += 1
+        return count
+
+    def merge(self, sources):
+        for source in sources:
+            self.add_source(source)
+        return self.result()
+
+    def result(self):
+        out = OrderedDict()
+        for fp, rec in self.records.items():
+            out[self.texts[fp]] = OrderedDict(sorted(rec.items()))
+        return OrderedDict(sorted(out.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-p",
+        "--ignore-punctuation",
+        action="store_true",
+        help="treat texts that only differ in punctuation as the same text",
+    )
+    parser.add_argument("-o", "--output", default=str(outpath))
+    parser.add_argument("-c", "--conflicts", default=str(conflictspath))
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        help="extra text-keyed YAML files, merged after the built-in sources",
+    )
+    args = parser.parse_args()
+
+    sources = list(SOURCES)
+    for path in args.sources:
+        sources.append({"path": Path(path), "source": str(path)})
+
+    merger = Art1Merger(ignore_punctuation=args.ignore_punctuation)
+    merged = merger.merge(sources)
+
+    print(f"{len(merged)} records, {len(merger.conflicts)} conflicts", file=sys.stderr)
+    with open(args.output, "w", encoding="utf-8") as f:
+        writer.yaml(merged, f, mini=False)
+    with open(args.conflicts, "w", encoding="utf-8") as f:
+        writer.yaml(merger.conflicts, f, mini=False)
+
+
+if __name__ == "__main__":
+    main()
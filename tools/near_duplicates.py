@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Finds near-duplicate texts among the translations and merged records.
+
+Every article of every corpus translation and every record of the merged
+Article 1 files is normalized (`merge_art1.normalize_text()`), cut into
+overlapping character shingles and summarized as a MinHash signature of
+`PERMUTATIONS` values. Signatures are split into `BANDS` bands; texts that
+share any band end up in the same bucket and become candidate pairs, so not
+all pairs are compared. Candidates whose estimated Jaccard similarity is at
+least the threshold are reported, together with the clusters they form.
+
+    python near_duplicates.py                       # article 1 vs merged files
+    python near_duplicates.py --articles all -t 0.9
+    python near_duplicates.py ../merged/udhr-art1-omniglot8.yaml
+"""
+
+import argparse
+import sys
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from lxml import etree
+
+from merge_art1 import iter_yaml_items, normalize_text
+from udhr_corpus import iter_paragraphs, read_catalog
+
+merged_folder = Path(Path(__file__).parent, "..", "merged")
+MERGED_FILES = [
+    Path(merged_folder, "udhr-art1-omniglot7.yaml"),
+    Path(merged_folder, "udhr-art1-merged.yaml"),
+]
+
+SHINGLE = 5
+PERMUTATIONS = 128
+BANDS = 32
+THRESHOLD = 0.8
+PRIME = (1 << 61) - 1
+SEED = 1948
+
+
+class MinHasher:
+    def __init__(self, permutations=PERMUTATIONS, shingle=SHINGLE, seed=SEED):
+        rng = np.random.default_rng(seed)
+        # a * x + b with x < 2**32 and a, b < 2**29 stays below 2**61 - 1
+        self.a = rng.integers(1, 1 << 29, permutations, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 29, permutations, dtype=np.uint64)
+        self.shingle = shingle
+
+    def shingles(self, text):
+        text = normalize_text(text).casefold()
+        if len(text) <= self.shingle:
+            return {text}
+        return {text[i : i + self.shingle] for i in range(len(text) - self.shingle + 1)}
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in self.shingles(text)),
+            dtype=np.uint64,
+        )
+        values = (np.outer(hashes, self.a) + self.b) % PRIME
+        return values.min(axis=0)
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """Returns the set of (i, j) row pairs of signatures with i < j that agree
+    on all rows of at least one band."""
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = np.ascontiguousarray(signatures[:, band * rows : (band + 1) * rows])
+        for i, row in enumerate(chunk):
+            buckets[row.tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def clusters(pairs, count):
+    """Returns the connected components with more than one member."""
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        parent[find(i)] = find(j)
+    groups = defaultdict(list)
+    for i in range(count):
+        groups[find(i)].append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def corpus_texts(articles):
+    """Yields (label, owner, text) for the given article numbers (all if
+    None) of the corpus translations."""
+    for entry in read_catalog():
+        if entry["path"] is None:
+            continue
+        texts = defaultdict(list)
+        try:
+            for row in iter_paragraphs(entry["path"]):
+                if row.section == "article" and row.para > 0:
+                    if articles is None or row.article in articles:
+                        texts[row.article].append(row.text)
+        except etree.XMLSyntaxError as e:
+            print(f"Skipping {entry['path']}: {e}", file=sys.stderr)
+            continue
+        for article, paras in texts.items():
+            yield f"{entry['folder']}/{entry['f']}#{article}", entry["f"], " ".join(
+                paras
+            )
+
+
+def merged_texts(paths):
+    """Yields (label, owner, text) for the records of text-keyed merged YAML
+    files, owned by their `udhr_key` if they have one."""
+    for path in paths:
+        if not Path(path).exists():
+            continue
+        for text, rec in iter_yaml_items(path):
+            rec = rec or {}
+            code = rec.get("lang_full") or rec.get("lang", "")
+            yield f"{Path(path).stem}:{code}", rec.get("udhr_key"), str(text)
+
+
+def find_near_duplicates(items, threshold=THRESHOLD, hasher=None):
+    """Returns ([(similarity, i, j)], clusters) for items of (label, owner,
+    text). Pairs of identical texts with the same owner (a translation key)
+    are ignored, so a merged record does not match its own source."""
+    hasher = hasher or MinHasher()
+    signatures = np.vstack([hasher.signature(text) for _, _, text in items])
+    found = []
+    for i, j in candidate_pairs(signatures):
+        owner = items[i][1]
+        if owner is not None and owner == items[j][1]:
+            if normalize_text(items[i][2]) == normalize_text(items[j][2]):
+                continue
+        similarity = float(np.mean(signatures[i] == signatures[j]))
+        if similarity >= threshold:
+            found.append((similarity, i, j))
+    found.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+    return found, clusters([(i, j) for _, i, j in found], len(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("merged", nargs="*", help="merged YAML files")
+    parser.add_argument(
+        "-a", "--articles", default="1", help='article numbers, e.g. "1,2", or "all"'
+    )
+    parser.add_argument("-t", "--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--pairs", action="store_true", help="list all pairs")
+    args = parser.parse_args()
+
+    articles = None
+    if args.articles != "all":
+        articles = {int(n) for n in args.articles.split(",")}
+    items = list(corpus_texts(articles))
+    items += list(merged_texts(args.merged or MERGED_FILES))
+    found, groups = find_near_duplicates(items, args.threshold)
+    if args.pairs:
+        for similarity, i, j in found:
+            print(f"{similarity:.3f}\t{items[i][0]}\t{items[j][0]}")
+    for group in sorted(groups, key=len, reverse=True):
+        print(f"{len(group)} texts: " + ", ".join(items[i][0] for i in group))
+    print(
+        f"{len(items)} texts, {len(found)} pairs, {len(groups)} clusters",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Renders the corpus as a static HTML site.
+
+Every translation of the unified catalog (`udhr`, `udhr-manual` and
+`udhr-translit`) becomes `build/site/FOLDER/KEY.html`, with its `lang`,
+`dir` and a font stack for its `iso15924` script, and `build/site/index.html`
+lists all translations by script and language. Pages are rendered in a
+process pool. A page is rebuilt only when the hash of its source document,
+its catalog entry or the templates changed; the hashes of the last build are
+kept in `build/site/manifest.json`, and pages of removed translations are
+deleted.
+
+    python render_site.py          # render changed pages
+    python render_site.py -f       # render all pages
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from string import Template
+
+from lxml import etree
+
+from udhr_corpus import iter_paragraphs, read_catalog
+from yaplon import reader
+
+site_folder = Path(Path(__file__).parent, "..", "build", "site")
+scripts_path = Path(Path(__file__).parent, "scripts.yaml")
+
+MANIFEST = "manifest.json"
+
+# Noto families whose name does not follow "Noto Sans <script name>".
+FONT_FAMILIES = {
+    "Latn": ["Noto Sans", "Noto Serif"],
+    "Cyrl": ["Noto Sans", "Noto Serif"],
+    "Grek": ["Noto Sans", "Noto Serif"],
+    "Arab": ["Noto Naskh Arabic", "Noto Sans Arabic"],
+    "Aran": ["Noto Nastaliq Urdu"],
+    "Hans": ["Noto Sans SC", "Noto Serif SC"],
+    "Hant": ["Noto Sans TC", "Noto Serif TC"],
+    "Hani": ["Noto Sans SC", "Noto Sans TC"],
+    "Jpan": ["Noto Sans JP", "Noto Serif JP"],
+    "Kore": ["Noto Sans KR", "Noto Serif KR"],
+    "Hebr": ["Noto Serif Hebrew", "Noto Sans Hebrew"],
+    "Beng": ["Noto Sans Bengali", "Noto Serif Bengali"],
+    "Ethi": ["Noto Sans Ethiopic", "Noto Serif Ethiopic"],
+    "Syrc": ["Noto Sans Syriac"],
+}
+
+CSS = """\
+body { margin: 2em auto; max-width: 40em; padding: 0 1em; line-height: 1.5; }
+h1 { font-size: 1.6em; } h2 { font-size: 1.2em; margin-top: 1.5em; }
+nav { font-family: sans-serif; font-size: 0.9em; margin-bottom: 2em; }
+table { border-collapse: collapse; font-family: sans-serif; font-size: 0.9em; }
+td, th { padding: 0.2em 0.6em; text-align: start; vertical-align: top; }
+.meta { color: #666; }
+"""
+
+PAGE = Template("""\
+<!DOCTYPE html>
+<html lang="$lang" dir="$dir">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<link rel="stylesheet" href="../style.css">
+<style>body { font-family: $fonts; }</style>
+</head>
+<body>
+<nav dir="ltr" lang="en"><a href="../index.html">Index</a> · $name · \
+<span class="meta">$key · $bcp47 · $script · stage $stage</span></nav>
+$body
+</body>
+</html>
+""")
+
+INDEX = Template("""\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Universal Declaration of Human Rights</title>
+<link rel="stylesheet" href="style.css">
+</head>
+<body>
+<h1>Universal Declaration of Human Rights</h1>
+<p>$count translations in $scripts scripts.</p>
+$body
+</body>
+</html>
+""")
+
+
+def template_hash():
+    h = hashlib.sha1()
+    for part in (CSS, PAGE.template, INDEX.template, json.dumps(FONT_FAMILIES)):
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+
+def script_names():
+    with open(scripts_path, encoding="utf-8") as f:
+        return reader.yaml(f)
+
+
+def font_stack(script, names):
+    """Returns the CSS font-family list for an ISO 15924 script code."""
+    families = FONT_FAMILIES.get(script)
+    if families is None:
+        name = names.get(script, "")
+        if "(" in name:
+            name = name[name.index("(") + 1 : name.index(")")]
+        families = [f"Noto Sans {name}", f"Noto Serif {name}"] if name else []
+    return ", ".join([f'"{f}"' for f in families] + ["sans-serif"])
+
+
+def render_body(path):
+    """Returns the HTML of the text of the document at path."""
+    parts = []
+    for row in iter_paragraphs(path):
+        text = html.escape(row.text)
+        if row.section == "title":
+            parts.append(f"<h1>{text}</h1>")
+        elif row.para == 0:
+            parts.append(f'<h2 id="{row.section}-{row.article}">{text}</h2>')
+        else:
+            parts.append(f"<p>{text}</p>")
+    return "\n".join(parts)
+
+
+def render_page(job):
+    """Renders one page; job is (entry, out path, font stack). Returns (out
+    path, error or None)."""
+    entry, out, fonts = job
+    try:
+        body = render_body(entry["path"])
+    except etree.XMLSyntaxError as e:
+        return out, str(e)
+    page = PAGE.substitute(
+        lang=html.escape(entry["bcp47"] or entry["iso639-3"]),
+        dir=entry["dir"] or "ltr",
+        title=html.escape(entry["n"]),
+        fonts=fonts,
+        name=html.escape(entry["n"]),
+        key=html.escape(entry["f"]),
+        bcp47=html.escape(entry["bcp47"]),
+        script=html.escape(entry["iso15924"]),
+        stage=entry["stage"],
+        body=body,
+    )
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(page, encoding="utf-8")
+    return str(out), None
+
+
+def render_index(entries, names):
+    """Returns the HTML of the index, by script and then language name."""
+    by_script = defaultdict(list)
+    for entry in entries:
+        by_script[entry["iso15924"]].append(entry)
+    parts = []
+    for script in sorted(by_script, key=lambda s: (names.get(s, s), s)):
+        title = html.escape(f"{names.get(script, script)} ({script})")
+        parts.append(f'<h2 id="{html.escape(script)}">{title}</h2>')
+        parts.append("<table>")
+        for entry in sorted(by_script[script], key=lambda e: (e["n"], e["f"])):
+            href = f"{entry['folder']}/{entry['f']}.html"
+            parts.append(
+                f'<tr><td><a href="{html.escape(href)}">{html.escape(entry["n"])}'
+                f'</a></td><td class="meta">{html.escape(entry["bcp47"])}</td>'
+                f'<td class="meta">{entry["stage"]}</td></tr>'
+            )
+        parts.append("</table>")
+    return INDEX.substitute(
+        count=len(entries), scripts=len(by_script), body="\n".join(parts)
+    )
+
+
+def page_hash(entry, templates):
+    h = hashlib.sha1(templates.encode("utf-8"))
+    meta = {k: v for k, v in entry.items() if k != "path"}
+    h.update(json.dumps(meta, sort_keys=True).encode("utf-8"))
+    with open(entry["path"], "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+class SiteRenderer:
+    def __init__(self, folder=site_folder):
+        self.folder = Path(folder)
+        self.manifest_path = Path(self.folder, MANIFEST)
+        self.manifest = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def save(self):
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=0, sort_keys=True)
+
+    def render(self, force=False, workers=None):
+        """Renders the pages whose hash changed and the index. Returns the
+        (number of pages rendered, list of (page, error))."""
+        names = script_names()
+        templates = template_hash()
+        entries = [e for e in read_catalog() if e["path"] is not None]
+        jobs = []
+        hashes = {}
+        for entry in entries:
+            rel = f"{entry['folder']}/{entry['f']}.html"
+            hashes[rel] = page_hash(entry, templates)
+            out = Path(self.folder, rel)
+            if force or self.manifest.get(rel) != hashes[rel] or not out.exists():
+                fonts = font_stack(entry["iso15924"], names)
+                jobs.append((dict(entry, path=str(entry["path"])), str(out), fonts))
+        errors = []
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for out, error in pool.map(render_page, jobs, chunksize=8):
+                    rel = Path(out).relative_to(self.folder).as_posix()
+                    if error:
+                        errors.append((rel, error))
+                        hashes.pop(rel, None)
+                    else:
+                        self.manifest[rel] = hashes[rel]
+        for rel in list(self.manifest):
+            if rel not in hashes:
+                Path(self.folder, rel).unlink(missing_ok=True)
+                del self.manifest[rel]
+        Path(self.folder, "style.css").write_text(CSS, encoding="utf-8")
+        rendered = [
+            e for e in entries if f"{e['folder']}/{e['f']}.html" in self.manifest
+        ]
+        index = render_index(rendered, names)
+        Path(self.folder, "index.html").write_text(index, encoding="utf-8")
+        self.save()
+        return len(jobs) - len(errors), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=str(site_folder))
+    parser.add_argument("-f", "--force", action="store_true", help="render all")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    renderer = SiteRenderer(args.output)
+    rendered, errors = renderer.render(args.force, args.jobs)
+    for rel, error in errors:
+        print(f"{rel}: {error}", file=sys.stderr)
+    print(f"{rendered} pages rendered, {len(renderer.manifest)} in site")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Runs the stages of the data pipeline that are out of date.
+
+The stages, with the files they read and write and the stages they need,
+are declared in `pipeline.yml`. A stage runs after the stages in its
+`needs`, and is rerun when the content hash of its inputs differs from the
+last successful run or one of its outputs is missing. Independent stages run in
+parallel; a stage that fails skips the stages that depend on it. File hashes
+and stage stamps are kept in `build/pipeline_state.json`, so only files whose
+size or mtime changed are rehashed. The tool works from any directory.
+
+    python run_pipeline.py                    # run all outdated stages
+    python run_pipeline.py merge_art1         # a stage and what it needs
+    python run_pipeline.py -n                 # list what would run
+
+`--graph` prints the dependencies and warns about stages whose inputs can
+match the outputs of a stage they do not need.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from yaplon import reader
+
+repo_folder = Path(Path(__file__).parent, "..").resolve()
+pipeline_path = Path(Path(__file__).parent, "pipeline.yml")
+state_path = Path(repo_folder, "build", "pipeline_state.json")
+
+STATE_VERSION = 1
+
+
+class Stage:
+    def __init__(self, name, rec):
+        self.name = name
+        self.command = list(rec["command"])
+        self.cwd = Path(repo_folder, rec.get("cwd", "."))
+        self.inputs = list(rec.get("inputs", []))
+        self.outputs = list(rec.get("outputs", []))
+        script = Path(self.cwd, self.command[0])
+        if script.suffix == ".py":
+            self.command = [sys.executable, *self.command]
+            self.inputs.insert(0, script.relative_to(repo_folder).as_posix())
+        self.deps = set(rec.get("needs", []))
+
+    def reads_from(self, other):
+        return any(overlaps(i, o) for i in self.inputs for o in other.outputs)
+
+
+def overlaps(a, b):
+    """Returns True if the path patterns a and b can match the same file."""
+    return fnmatch.fnmatchcase(a, b) or fnmatch.fnmatchcase(b, a)
+
+
+def expand(pattern):
+    """Returns the files under the repository that match pattern, sorted."""
+    if not any(c in pattern for c in "*?["):
+        path = Path(repo_folder, pattern)
+        return [path] if path.is_file() else []
+    return sorted(p for p in repo_folder.glob(pattern) if p.is_file())
+
+
+class Pipeline:
+    def __init__(self, path=pipeline_path, state=state_path):
+        with open(path, encoding="utf-8") as f:
+            stages = reader.yaml(f)
+        self.stages = {name: Stage(name, rec) for name, rec in stages.items()}
+        for stage in self.stages.values():
+            for dep in sorted(stage.deps):
+                if dep not in self.stages:
+                    raise KeyError(f"{stage.name} needs unknown stage {dep}")
+        self.order = self.toposort()
+        self.state_path = Path(state)
+        self.hashes = {}
+        self.stamps = {}
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.hashes = data["hashes"]
+                self.stamps = data["stamps"]
+        self.lock = threading.Lock()
+
+    def toposort(self):
+        order = []
+        marks = {}
+
+        def visit(name, path):
+            if marks.get(name) == "done":
+                return
+            if marks.get(name) == "open":
+                raise ValueError("dependency cycle: " + " -> ".join(path + [name]))
+            marks[name] = "open"
+            for dep in sorted(self.stages[name].deps):
+                visit(dep, path + [name])
+            marks[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def undeclared(self):
+        """Returns [(stage, other)] for the stages whose inputs can match the
+        outputs of another stage that they do not need, even indirectly."""
+        found = []
+        for name in self.order:
+            upstream = set(self.select([name]))
+            for other in self.order:
+                if other not in upstream and self.stages[name].reads_from(
+                    self.stages[other]
+                ):
+                    found.append((name, other))
+        return found
+
+    def save(self):
+        with self.lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"version": STATE_VERSION, "hashes": self.hashes}
+            data["stamps"] = self.stamps
+            tmp = self.state_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=0, sort_keys=True)
+            tmp.replace(self.state_path)
+
+    def file_hash(self, path):
+        """Returns the sha1 of path, reusing the stored hash if the size and
+        mtime of the file did not change."""
+        key = path.relative_to(repo_folder).as_posix()
+        st = path.stat()
+        with self.lock:
+            cached = self.hashes.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        with self.lock:
+            self.hashes[key] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def stamp(self, stage):
+        """Returns the hash of the command and input contents of stage, or
+        raises FileNotFoundError if a literal input is missing."""
+        h = hashlib.sha1(json.dumps(stage.command[1:]).encode("utf-8"))
+        for pattern in stage.inputs:
+            paths = expand(pattern)
+            if not paths and not any(c in pattern for c in "*?["):
+                raise FileNotFoundError(f"missing input {pattern}")
+            for path in paths:
+                rel = path.relative_to(repo_folder).as_posix()
+                h.update(f"{rel}\0{self.file_hash(path)}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def outdated(self, stage):
+        """Returns the reason stage must run, or None if it is up to date."""
+        try:
+            stamp = self.stamp(stage)
+        except FileNotFoundError as e:
+            return str(e)
+        if self.stamps.get(stage.name) != stamp:
+            return "inputs changed"
+        for pattern in stage.outputs:
+            if not expand(pattern):
+                return f"missing output {pattern}"
+        return None
+
+    def select(self, targets):
+        """Returns the names of targets and their upstream stages, in
+        dependency order."""
+        if not targets:
+            return list(self.order)
+        for name in targets:
+            if name not in self.stages:
+                raise KeyError(f"unknown stage {name}")
+        wanted = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in wanted:
+                wanted.add(name)
+                todo += self.stages[name].deps
+        return [name for name in self.order if name in wanted]
+
+    def run_stage(self, stage, force=False):
+        """Runs stage if it is outdated. Returns (status, output)."""
+        reason = self.outdated(stage)
+        if reason is None and not force:
+            return "up to date", ""
+        try:
+            stamp = self.stamp(stage)
+        except FileNotFoundError as e:
+            return "failed", str(e)
+        proc = subprocess.run(
+            stage.command,
+            cwd=stage.cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+        )
+        if proc.returncode:
+            return "failed", proc.stdout
+        with self.lock:
+            self.stamps[stage.name] = stamp
+        self.save()
+        return "ran", proc.stdout
+
+    def run(self, targets=None, jobs=None, force=False, log=print):
+        """Runs the outdated stages among targets, each as soon as the stages
+        it depends on finished. Returns {name: status}."""
+        names = self.select(targets)
+        status = {}
+        pending = set(names)
+        running = {}
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            while pending or running:
+                for name in [n for n in names if n in pending]:
+                    deps = self.stages[name].deps & set(names)
+                    if any(status.get(d) in ("failed", "skipped") for d in deps):
+                        pending.discard(name)
+                        status[name] = "skipped"
+                        log(f"{name}: skipped")
+                    elif all(d in status for d in deps):
+                        pending.discard(name)
+                        future = pool.submit(self.run_stage, self.stages[name], force)
+                        running[future] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status[name], output = future.result()
+                    log(f"{name}: {status[name]}")
+                    if output.strip() and status[name] != "up to date":
+                        log("    " + output.rstrip().replace("\n", "\n    "))
+        self.save()
+        return status
+
+    def plan(self, targets=None):
+        """Returns [(name, reason)] for the stages among targets that would
+        run; stages downstream of an outdated stage may run too."""
+        names = self.select(targets)
+        plan = []
+        dirty = set()
+        for name in names:
+            reason = self.outdated(self.stages[name])
+            if reason is None and self.stages[name].deps & dirty:
+                reason = "upstream outdated"
+            if reason:
+                dirty.add(name)
+                plan.append((name, reason))
+        return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("stages", nargs="*", help="stages to bring up to date")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("-f", "--force", action="store_true", help="rerun stages")
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="list outdated stages"
+    )
+    parser.add_argument(
+        "--graph", action="store_true", help="print stages and dependencies"
+    )
+    args = parser.parse_args()
+
+    try:
+        pipeline = Pipeline()
+        if args.graph:
+            for name in pipeline.select(args.stages):
+                deps = ", ".join(sorted(pipeline.stages[name].deps))
+                print(f"{name}: {deps}" if deps else name)
+            for name, other in pipeline.undeclared():
+                print(
+                    f"warning: {name} reads outputs of {other} but does not need it",
+                    file=sys.stderr,
+                )
+            return
+        if args.dry_run:
+            for name, reason in pipeline.plan(args.stages):
+                print(f"{name}: {reason}")
+            pipeline.save()
+            return
+        status = pipeline.run(args.stages, args.jobs, args.force)
+    except (KeyError, ValueError) as e:
+        print(e.args[0], file=sys.stderr)
+        sys.exit(2)
+    if any(s in ("failed", "skipped") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Indexes the grapheme clusters and words of every corpus paragraph.
+
+Counting code points with `len()` or splitting on whitespace gives wrong
+lengths for Devanagari, Thai, Khmer, Han and many other scripts, so each
+document is segmented once and the boundaries are kept as NumPy offset
+arrays in `build/segments/FOLDER/KEY.npz`:
+
+    text       the paragraphs, concatenated, as UTF-8
+    para       start of each paragraph in text, plus the end (code points)
+    rows       section, article and para of each paragraph (SECTIONS)
+    g_ptr      first grapheme cluster of each paragraph, plus the end
+    g_end      end of each grapheme cluster in text
+    w_ptr      first word of each paragraph, plus the end; empty if the
+               words of the document cannot be segmented (see below)
+    w_span     start and end of each word in text
+
+The offsets only grow, so they are stored as differences in the smallest
+unsigned type and the index takes less space than the documents.
+
+Grapheme clusters are the extended grapheme clusters of UAX #29 (`\\X` of the
+regex module). Words come from the ICU word break iterator for the
+document's BCP 47 tag when PyICU is installed, which uses dictionaries for
+Thai, Lao, Khmer, Myanmar and Han, and from the UAX #29 word boundaries
+otherwise; only segments with a letter or a digit count as words. UAX #29
+alone splits the scripts that need a dictionary into single characters, so
+without PyICU documents with text in them get no words, and `counts()`,
+`select()` and `truncate()` raise `ValueError` for the word unit. The
+segmenter used is stored with the index.
+
+The index is rebuilt incrementally: `build/segments/manifest.json` keeps the
+size, mtime and hash of every source document, and only the documents that
+changed are segmented again, in parallel. `Segments` loads one document's
+index; `counts()`, `select()` and `truncate()` work on all paragraphs at once.
+
+    python segment_index.py                          # update the index
+    python segment_index.py --key tha --unit word    # counts per paragraph
+    python segment_index.py --key hin --truncate 20  # first 20 clusters
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import regex
+from lxml import etree
+
+from udhr_corpus import canonical_path, iter_paragraphs, read_catalog
+
+try:
+    import icu
+except ImportError:
+    icu = None
+
+index_folder = Path(Path(__file__).parent, "..", "build", "segments")
+manifest_path = Path(index_folder, "manifest.json")
+
+INDEX_VERSION = 2
+SECTIONS = ["title", "preamble", "article", "note"]
+UNITS = ["grapheme", "word"]
+
+GRAPHEME_RE = regex.compile(r"\X")
+WORD_BOUNDARY_RE = regex.compile(r"\b", flags=regex.WORD)
+WORD_RE = regex.compile(r"[\p{L}\p{N}]")
+# Scripts written without spaces between words, which need the dictionaries
+# of ICU to be segmented into words.
+DICTIONARY_RE = regex.compile(
+    r"[\p{sc=Thai}\p{sc=Lao}\p{sc=Khmer}\p{sc=Myanmar}\p{sc=Han}\p{sc=Hiragana}]"
+)
+
+# ICU rule statuses below this value are spaces and punctuation.
+ICU_WORD_NONE_LIMIT = 100
+
+
+def segmenter_name():
+    return "icu" if icu is not None else "uax29"
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def grapheme_ends(text):
+    return [m.end() for m in GRAPHEME_RE.finditer(text)]
+
+
+def uax29_words(text):
+    """Returns the (start, end) spans of the words of text between UAX #29
+    word boundaries."""
+    bounds = [m.start() for m in WORD_BOUNDARY_RE.finditer(text)]
+    return [
+        (start, end)
+        for start, end in zip(bounds, bounds[1:])
+        if WORD_RE.search(text, start, end)
+    ]
+
+
+def smallest_uint(value):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def pack(offsets):
+    """Returns the differences of ascending offsets in the smallest unsigned
+    type; they are mostly tiny and compress well."""
+    deltas = np.diff(offsets.ravel(), prepend=0)
+    return deltas.astype(smallest_uint(deltas.max(initial=0)))
+
+
+def unpack(deltas):
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+class IcuWords:
+    """Word spans from the ICU word break iterator of one locale."""
+
+    def __init__(self, tag):
+        self.iterator = icu.BreakIterator.createWordInstance(icu.Locale(tag or "und"))
+
+    def __call__(self, text):
+        self.iterator.setText(text)
+        # ICU counts UTF-16 code units; subtract the low surrogates before
+        # each offset to get code points.
+        units = np.frombuffer(text.encode("utf-16-le"), dtype=np.uint16)
+        low = np.concatenate([[0], np.cumsum((units >= 0xDC00) & (units < 0xE000))])
+        spans = []
+        start = self.iterator.first()
+        for end in self.iterator:
+            if self.iterator.getRuleStatus() >= ICU_WORD_NONE_LIMIT:
+                spans.append((int(start - low[start]), int(end - low[end])))
+            start = end
+        return spans
+
+
+class Segments:
+    """The segmentation index of one document."""
+
+    # Ascending offset arrays, stored as differences (see pack()).
+    OFFSETS = ["para", "g_ptr", "g_end", "w_ptr", "w_span"]
+
+    def __init__(self, text, para, rows, g_ptr, g_end, w_ptr, w_span, segmenter):
+        self.text = text
+        self.para = np.asarray(para, dtype=np.int32)
+        self.rows = np.asarray(rows, dtype=np.int32).reshape(-1, 3)
+        self.g_ptr = np.asarray(g_ptr, dtype=np.int32)
+        self.g_end = np.asarray(g_end, dtype=np.int32)
+        self.w_ptr = np.asarray(w_ptr, dtype=np.int32)
+        self.w_span = np.asarray(w_span, dtype=np.int32).reshape(-1, 2)
+        self.segmenter = segmenter
+
+    @property
+    def has_words(self):
+        """Whether the document was segmented into words."""
+        return len(self.w_ptr) > 0
+
+    @classmethod
+    def build(cls, paragraphs, tag=None, segmenter=None):
+        """Segments paragraphs, [Paragraph] rows of a document whose language
+        has the BCP 47 tag. Without ICU, a document with text in a script
+        that needs a dictionary gets no words."""
+        segmenter = segmenter or segmenter_name()
+        paragraphs = list(paragraphs)
+        if segmenter == "icu":
+            words = IcuWords(tag)
+        elif any(DICTIONARY_RE.search(row.text) for row in paragraphs):
+            words = None
+        else:
+            words = uax29_words
+        texts = []
+        para = [0]
+        rows = []
+        g_ptr = [0]
+        g_end = []
+        w_ptr = [0]
+        w_span = []
+        for row in paragraphs:
+            start = para[-1]
+            texts.append(row.text)
+            para.append(start + len(row.text))
+            rows.append((SECTIONS.index(row.section), row.article, row.para))
+            g_end += [start + end for end in grapheme_ends(row.text)]
+            g_ptr.append(len(g_end))
+            if words is not None:
+                w_span += [(start + s, start + e) for s, e in words(row.text)]
+                w_ptr.append(len(w_span))
+        if words is None:
+            w_ptr = []
+        return cls("".join(texts), para, rows, g_ptr, g_end, w_ptr, w_span, segmenter)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            text = data["text"].tobytes().decode("utf-8")
+            rows = data["rows"]
+            offsets = [unpack(data[name]) for name in cls.OFFSETS]
+            segmenter = str(data["segmenter"])
+        return cls(text, offsets[0], rows, *offsets[1:], segmenter)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {name: pack(getattr(self, name)) for name in self.OFFSETS}
+        arrays["text"] = np.frombuffer(self.text.encode("utf-8"), dtype=np.uint8)
+        arrays["rows"] = self.rows.astype(smallest_uint(self.rows.max(initial=0)))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, segmenter=np.array(self.segmenter), **arrays)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def paragraph(self, i):
+        return self.text[self.para[i] : self.para[i + 1]]
+
+    def pointers(self, unit):
+        if unit == "grapheme":
+            return self.g_ptr, self.g_end
+        if unit == "word":
+            if not self.has_words:
+                raise ValueError(
+                    "the words of this document need a dictionary; "
+                    "install PyICU and rebuild the index"
+                )
+            return self.w_ptr, self.w_span[:, 1]
+        raise ValueError(f"unknown unit {unit}")
+
+    def counts(self, unit="grapheme"):
+        """Returns the number of units of each paragraph."""
+        return np.diff(self.pointers(unit)[0])
+
+    def select(self, lo, hi, unit="word", sections=("preamble", "article")):
+        """Returns the indices of the paragraphs in sections with lo to hi
+        units, both included."""
+        counts = self.counts(unit)
+        wanted = np.isin(self.rows[:, 0], [SECTIONS.index(s) for s in sections])
+        return np.flatnonzero(wanted & (counts >= lo) & (counts <= hi))
+
+    def truncate(self, n, unit="grapheme", indices=None):
+        """Returns the paragraphs (all, or those at indices) cut after their
+        first n units; shorter paragraphs are returned whole."""
+        ptr, ends = self.pointers(unit)
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.int64)
+        first = ptr[indices]
+        counts = ptr[indices + 1] - first
+        take = np.minimum(counts, max(n, 0))
+        cut = np.where(
+            take > 0, ends[np.maximum(first + take - 1, 0)], self.para[indices]
+        )
+        cut = np.where(take == counts, self.para[indices + 1], cut)
+        return [
+            self.text[start:end]
+            for start, end in zip(self.para[indices].tolist(), cut.tolist())
+        ]
+
+
+def segments_path(folder, key):
+    return Path(index_folder, folder, f"{key}.npz")
+
+
+def load_segments(key, folder="udhr"):
+    """Returns the Segments of the document for key in folder."""
+    return Segments.load(segments_path(folder, key))
+
+
+def _segment(job):
+    name, path, tag, segmenter = job
+    try:
+        segments = Segments.build(iter_paragraphs(path), tag, segmenter)
+    except etree.XMLSyntaxError as e:
+        return name, str(e)
+    segments.save(segments_path(*name.split("/")))
+    return name, None
+
+
+class SegmentIndex:
+    def __init__(self, manifest=manifest_path):
+        self.manifest_path = Path(manifest)
+        self.segmenter = segmenter_name()
+        self.files = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if (
+                data.get("version") == INDEX_VERSION
+                and data.get("segmenter") == self.segmenter
+            ):
+                self.files = data.get("files", {})
+
+    def save(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "segmenter": self.segmenter,
+                    "files": self.files,
+                },
+                f,
+                indent=0,
+                sort_keys=True,
+            )
+        tmp.replace(self.manifest_path)
+
+    def update(self, workers=None, log=print):
+        """Segments the documents that changed since the last update, removes
+        the index of documents that are gone, and returns (documents,
+        segmented, removed)."""
+        todo = []
+        current = {}
+        for entry in read_catalog():
+            if entry["path"] is None:
+                continue
+            name = f"{entry['folder']}/{entry['f']}"
+            path = canonical_path(entry["path"])
+            st = path.stat()
+            rec = [st.st_mtime_ns, st.st_size]
+            old = self.files.get(name)
+            indexed = old is not None and segments_path(*name.split("/")).exists()
+            if indexed and old[:2] == rec:
+                current[name] = old
+                continue
+            rec.append(file_hash(path))
+            current[name] = rec
+            if not indexed or old[2] != rec[2]:
+                todo.append((name, str(path), entry["bcp47"], self.segmenter))
+        removed = [name for name in self.files if name not in current]
+        for name in removed:
+            segments_path(*name.split("/")).unlink(missing_ok=True)
+        segmented = 0
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for name, error in pool.map(_segment, todo, chunksize=4):
+                    if error:
+                        log(f"Skipping {name}: {error}")
+                        segments_path(*name.split("/")).unlink(missing_ok=True)
+                        del current[name]
+                    else:
+                        segmented += 1
+        self.files = current
+        self.save()
+        return len(self.files), segmented, len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="segment everything")
+    parser.add_argument("-k", "--key", help="print the index of one translation")
+    parser.add_argument("-d", "--folder", default="udhr", help="corpus folder")
+    parser.add_argument("-u", "--unit", choices=UNITS, default="grapheme")
+    parser.add_argument("--truncate", type=int, help="print the first N units")
+    args = parser.parse_args()
+
+    if args.key:
+        path = segments_path(args.folder, args.key)
+        if not path.exists():
+            print(f"{args.folder}/{args.key} is not indexed", file=sys.stderr)
+            sys.exit(1)
+        segments = Segments.load(path)
+        try:
+            counts = segments.counts(args.unit)
+        except ValueError as e:
+            print(f"{args.folder}/{args.key}: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.truncate is not None:
+            texts = segments.truncate(args.truncate, args.unit)
+        else:
+            texts = [segments.paragraph(i) for i in range(len(segments))]
+        for (section, article, para), count, text in zip(
+            segments.rows.tolist(), counts.tolist(), texts
+        ):
+            print(f"{SECTIONS[section]}\t{article}\t{para}\t{count}\t{text}")
+        return
+
+    index = SegmentIndex()
+    if args.force:
+        index.files = {}
+    documents, segmented, removed = index.update(
+        args.jobs, log=lambda m: print(m, file=sys.stderr)
+    )
+    print(
+        f"{documents} documents, {segmented} segmented, {removed} removed "
+        f"({index.segmenter} words)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Selects small sets of translations that cover scripts or codepoints.
+
+For every translation in the catalog the set of codepoints of its text is
+stored as a row of a bit matrix over all codepoints of the corpus, kept with
+the script, stage and length of each translation in `build/coverage.npz`
+(rebuilt when a corpus file is newer). A selection is a greedy set cover:
+each step adds the candidate that covers the most still-missing items per
+unit of cost, evaluated for all candidates at once with bitwise operations
+on the matrix. The cost is 1 per translation, or its length in characters
+with `--weighted`; preferred languages cost less. Candidates can be limited
+to a minimum stage and the selection to a total number of characters.
+
+A translation covers a script if its text contains codepoints whose Unicode
+Script property is that script; Common, Inherited and Unknown are not
+scripts to cover and are left out of the selection. Codes
+of scripts.yaml that are variants of an encoded script (Hans, Jpan, Aran...)
+are credited to translations labeled with them in the catalog whose text
+contains the underlying script, since the codepoints cannot tell them apart.
+
+    python select_coverage.py --scripts            # all scripts in scripts.yaml
+    python select_coverage.py --font Font.ttf      # all codepoints of a font
+    python select_coverage.py --font Font.ttf --weighted --prefer eng fra
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+from fontTools import unicodedata
+from lxml import etree
+
+from udhr_corpus import CORPUS_FOLDERS, data_folder, iter_paragraphs, read_catalog
+from yaplon import reader
+
+coverage_path = Path(Path(__file__).parent, "..", "build", "coverage.npz")
+scripts_path = Path(Path(__file__).parent, "scripts.yaml")
+
+MIN_STAGE = 4
+PREFERRED_COST = 0.5
+NEUTRAL_SCRIPTS = {"Zinh", "Zyyy", "Zzzz"}
+VARIANTS = {
+    "Aran": {"Arab"},
+    "Cyrs": {"Cyrl"},
+    "Hanb": {"Hani", "Bopo"},
+    "Hans": {"Hani"},
+    "Hant": {"Hani"},
+    "Jamo": {"Hang"},
+    "Jpan": {"Hani", "Hira", "Kana"},
+    "Kore": {"Hang"},
+    "Latf": {"Latn"},
+    "Latg": {"Latn"},
+    "Syre": {"Syrc"},
+    "Syrj": {"Syrc"},
+    "Syrn": {"Syrc"},
+}
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int32)
+
+
+def corpus_mtime():
+    mtime = 0
+    for folder in CORPUS_FOLDERS:
+        for path in Path(data_folder, folder).glob("*.xml"):
+            mtime = max(mtime, path.stat().st_mtime_ns)
+    return mtime
+
+
+def popcount(bits):
+    """Returns the number of set bits in each row of the uint8 matrix bits."""
+    return POPCOUNT[bits].sum(axis=-1)
+
+
+class Coverage:
+    """Per-translation codepoint bitsets with the catalog data needed to
+    select translations."""
+
+    FIELDS = ["keys", "names", "scripts", "stages", "lengths", "chars", "bits"]
+
+    def __init__(self, keys, names, scripts, stages, lengths, chars, bits):
+        self.keys = list(keys)
+        self.names = list(names)
+        self.scripts = list(scripts)
+        self.stages = np.asarray(stages, dtype=np.int32)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.chars = np.asarray(chars, dtype=np.int64)
+        self.bits = np.asarray(bits, dtype=np.uint8)
+
+    @classmethod
+    def build(cls):
+        keys, names, scripts, stages, lengths, sets = [], [], [], [], [], []
+        for entry in read_catalog():
+            if entry["path"] is None:
+                continue
+            try:
+                text = "".join(row.text for row in iter_paragraphs(entry["path"]))
+            except etree.XMLSyntaxError as e:
+                print(f"Skipping {entry['path']}: {e}", file=sys.stderr)
+                continue
+            keys.append(entry["f"])
+            names.append(entry["n"])
+            scripts.append(entry["iso15924"])
+            stages.append(entry["stage"])
+            lengths.append(len(text))
+            sets.append({ord(c) for c in text if not c.isspace()})
+        chars = np.array(sorted(set().union(*sets)), dtype=np.int64)
+        column = {cp: i for i, cp in enumerate(chars.tolist())}
+        matrix = np.zeros((len(keys), len(chars)), dtype=bool)
+        for row, cps in enumerate(sets):
+            matrix[row, [column[cp] for cp in cps]] = True
+        bits = np.packbits(matrix, axis=1)
+        return cls(keys, names, scripts, stages, lengths, chars, bits)
+
+    @classmethod
+    def load(cls, path=coverage_path, rebuild=False):
+        """Returns the stored coverage, rebuilding and saving it if it is
+        missing or older than the corpus."""
+        path = Path(path)
+        if not rebuild and path.exists() and path.stat().st_mtime_ns >= corpus_mtime():
+            with np.load(path) as data:
+                return cls(*(data[name] for name in cls.FIELDS))
+        coverage = cls.build()
+        coverage.save(path)
+        return coverage
+
+    def save(self, path=coverage_path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, **{name: np.asarray(getattr(self, name)) for name in self.FIELDS}
+            )
+
+    def codepoint_mask(self, codepoints):
+        """Returns the packed bit row of the codepoints present in the corpus
+        and the sorted list of those that are not."""
+        wanted = np.array(sorted(codepoints), dtype=np.int64)
+        present = np.isin(wanted, self.chars)
+        mask = np.isin(self.chars, wanted)
+        return np.packbits(mask), wanted[~present].tolist()
+
+    def script_matrix(self, scripts):
+        """Returns (packed bit matrix with one column per script, scripts).
+        A row has the bit of every script whose codepoints occur in its
+        text, and of a variant script when it is the catalog label and the
+        text contains the script it is a variant of. NEUTRAL_SCRIPTS are
+        left out."""
+        scripts = sorted(set(scripts) - NEUTRAL_SCRIPTS)
+        present = np.unpackbits(self.bits, axis=1, count=len(self.chars)).astype(bool)
+        char_scripts = np.array(
+            [unicodedata.script(cp) for cp in self.chars.tolist()], dtype=object
+        )
+        found = {}
+        for script in set(char_scripts.tolist()):
+            found[script] = present[:, char_scripts == script].any(axis=1)
+        matrix = np.zeros((len(self.keys), len(scripts)), dtype=bool)
+        for i, script in enumerate(scripts):
+            if script in found:
+                matrix[:, i] = found[script]
+            elif script in VARIANTS:
+                labeled = np.array([label == script for label in self.scripts])
+                base = np.zeros(len(self.keys), dtype=bool)
+                for underlying in VARIANTS[script] & found.keys():
+                    base |= found[underlying]
+                matrix[:, i] = labeled & base
+        return np.packbits(matrix, axis=1), scripts
+
+
+def greedy_cover(
+    bits,
+    target,
+    costs,
+    lengths=None,
+    allowed=None,
+    max_chars=None,
+):
+    """Greedy set cover over the packed bit rows of bits. Returns
+    (selection, need): selection is a list of (row, newly covered bits) in
+    selection order, and need the packed target bits that no selected row
+    covers. Each step picks the allowed row with the most target bits not
+    yet covered per unit of cost; with max_chars, rows that would exceed
+    the total length are skipped."""
+    need = target.copy()
+    allowed = np.ones(len(bits), dtype=bool) if allowed is None else allowed.copy()
+    used = 0
+    selection = []
+    while popcount(need):
+        gain = popcount(bits & need)
+        ok = allowed & (gain > 0)
+        if max_chars is not None:
+            ok &= used + lengths <= max_chars
+        if not ok.any():
+            break
+        score = np.where(ok, gain / costs, -1.0)
+        row = int(np.argmax(score))
+        new = bits[row] & need
+        selection.append((row, new))
+        need &= ~bits[row]
+        allowed[row] = False
+        if lengths is not None:
+            used += int(lengths[row])
+    return selection, need
+
+
+def unpack(packed, labels):
+    mask = np.unpackbits(packed)[: len(labels)].astype(bool)
+    return [label for label, m in zip(labels, mask) if m]
+
+
+def font_codepoints(path):
+    from fontTools.ttLib import TTFont
+
+    with TTFont(path, lazy=True) as font:
+        return {cp for cp in font.getBestCmap() if not chr(cp).isspace()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--scripts", action="store_true", help="cover scripts.yaml")
+    target.add_argument("--font", help="cover the codepoints of this font")
+    parser.add_argument("--min-stage", type=int, default=MIN_STAGE)
+    parser.add_argument(
+        "--weighted", action="store_true", help="cost is the length of a text"
+    )
+    parser.add_argument("--prefer", nargs="+", default=[], help="preferred keys")
+    parser.add_argument("--max-chars", type=int, help="limit the total length")
+    parser.add_argument("-r", "--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    coverage = Coverage.load(rebuild=args.rebuild)
+    if args.scripts:
+        with open(scripts_path, encoding="utf-8") as f:
+            wanted = set(reader.yaml(f))
+        bits, labels = coverage.script_matrix(wanted)
+        found = np.unpackbits(bits, axis=1, count=len(labels)).any(axis=0)
+        target = np.packbits(found)
+        missing = [s for s, f in zip(labels, found) if not f]
+    else:
+        bits = coverage.bits
+        target, missing = coverage.codepoint_mask(font_codepoints(args.font))
+        labels = [f"U+{cp:04X}" for cp in coverage.chars.tolist()]
+
+    costs = coverage.lengths.astype(float) if args.weighted else np.ones(len(bits))
+    costs = np.maximum(costs, 1.0)
+    preferred = np.isin(coverage.keys, args.prefer)
+    costs[preferred] *= PREFERRED_COST
+    allowed = coverage.stages >= args.min_stage
+    selection, need = greedy_cover(
+        bits, target, costs, coverage.lengths, allowed, args.max_chars
+    )
+
+    total = int(popcount(target))
+    covered = 0
+    for rank, (row, new) in enumerate(selection, 1):
+        gained = unpack(new, labels)
+        covered += len(gained)
+        print(
+            f"{rank:3}. {coverage.keys[row]:<16} {coverage.names[row]} "
+            f"({coverage.scripts[row]}, stage {coverage.stages[row]}, "
+            f"{coverage.lengths[row]} chars): +{len(gained)}, "
+            f"{covered}/{total} covered"
+        )
+        print("       " + " ".join(gained[:20]) + (" ..." if len(gained) > 20 else ""))
+    uncovered = unpack(need, labels)
+    if uncovered:
+        print(f"Not covered by any allowed candidate: {' '.join(uncovered)}")
+    if missing:
+        items = missing if args.scripts else [f"U+{cp:04X}" for cp in missing]
+        print(f"Not in the corpus: {' '.join(items)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,29 +25,56 @@
 # shaw.c requires all prefixes, then all suffixes, then all roots
 # sorted case-insensitive, with underscores sorted before letters.
 
+import io
+import itertools
 import sys
 from html.parser import HTMLParser
 
 import nltk
 
 apostrophe = "'"  # whatever you want for apostrophe, e.g. "’" or ""
-htags = {}
-tokens = []
-script = 0
 
-
-def notrans(str):
-    global htags
-    tok = len(tokens)
-    if tok in htags:
-        htags[tok] += str
-    else:
-        htags[tok] = str
+# Elements whose end tag closes a block: the words collected so far are
+# tagged, translated and written out before more input is read.
+blocks = set(
+    "address article aside blockquote body br dd div dl dt figcaption figure "
+    "footer h1 h2 h3 h4 h5 h6 head header hr html li main nav ol p pre section "
+    "table td th title tr ul".split()
+)
 
 
 class MyHTMLParser(HTMLParser):
+    """Collects the words of one block at a time, each with the markup that
+    precedes it, and hands every finished block to emit()."""
+
+    def __init__(self, emit):
+        super().__init__()
+        self.emit = emit
+        self.script = 0
+        self.text = ""  # data not yet tokenized
+        self.words = []  # (markup before the word, word) of this block
+        self.markup = ""  # markup after the last word
+
+    def notrans(self, str):
+        self.tokenize()
+        self.markup += str
+
+    def tokenize(self):
+        if self.text:
+            for word in nltk.word_tokenize(self.text):
+                self.words.append((self.markup, word))
+                self.markup = ""
+            self.text = ""
+
+    def flush(self):
+        self.tokenize()
+        tags = nltk.pos_tag([word for _, word in self.words])
+        words = [(before, tag) for (before, _), tag in zip(self.words, tags)]
+        self.emit(words, self.markup)
+        self.words = []
+        self.markup = ""
+
     def handle_starttag(self, tag, attrs):
-        global script
         out = "<" + tag
         for at in attrs:
             if at[0] == "charset":
@@ -59,21 +86,23 @@ class MyHTMLParser(HTMLParser):
                 out += '="' + at[1] + '"'
         out += ">"
         if tag == "noscript" or tag == "script" or tag == "style":
-            script = 1
-        notrans(out)
+            self.script = 1
+        self.notrans(out)
+        if tag in ("br", "hr"):
+            self.flush()
 
     def handle_endtag(self, tag):
-        global script
-        notrans("</" + tag + ">")
+        self.notrans("</" + tag + ">")
         if tag == "noscript" or tag == "script" or tag == "style":
-            script = 0
+            self.script = 0
+        if tag in blocks:
+            self.flush()
 
     def handle_data(self, data):
-        global script, tokens
-        if script:
-            notrans(data)
+        if self.script:
+            self.notrans(data)
         else:
-            tokens += nltk.word_tokenize(data)
+            self.text += data
 
 
 # break a string into alphabetic and non-alphabetic parts
@@ -265,93 +294,157 @@ for fname in sys.argv[1:]:
                 dict[word[0]] = word[1]
     at = 0
 
-text = sys.stdin.read()
-text = text.replace("’", "'").replace("&#8217;", "'").replace("&rsquo;", "'")
-text = text.replace("'s", " 's").replace("'S", " 's")
-if text.lower().find("<html") == -1:
-    text = text.replace("\n\n", " PARABREAK. ")
-
-parser = MyHTMLParser()
-parser.feed(text)
-
-tags = nltk.pos_tag(tokens) + [(" ", " ")]
-out = ""
-prev = ("", ".")
-tok = 0
-initial = True
-for token in tags:
-    if tok in htags:
-        out += htags[tok]
-    tok += 1
-    #  print (token)
-    if token[1] == "." or token[1] == ":" or token[1] == "``" or token[0] == "“":
-        initial = True
-    if token[0] == "PARABREAK" or prev[0] == "PARABREAK":
-        out += "\n"
-        prev = token
+
+class Shaver:
+    """Translates tagged words to Shavian, keeping the context of the
+    previous word across blocks."""
+
+    def __init__(self, write):
+        self.write = write
+        self.prev = ("", ".")
+        self.initial = True
+        self.tran = ""
+
+    def __call__(self, words, markup=""):
+        global whole
+        out = ""
+        prev = self.prev
+        initial = self.initial
+        tran = self.tran
+        for before, token in words:
+            out += before
+            #  print (token)
+            if (
+                token[1] == "."
+                or token[1] == ":"
+                or token[1] == "``"
+                or token[0] == "“"
+            ):
+                initial = True
+            if token[0] == "PARABREAK" or prev[0] == "PARABREAK":
+                out += "\n"
+                prev = token
+                continue
+            low = token[0].lower()
+            if low in cont:
+                apos = cont[low]
+                if low == "'s" and out:
+                    if "𐑐𐑑𐑒𐑓𐑔".find(out[-1]) + 1:
+                        apos = "'𐑕"
+                    if "𐑕𐑖𐑗𐑟𐑠𐑡".find(out[-1]) + 1:
+                        apos = "'𐑩𐑟"
+                if prev[0] == "do" and low == "n't" and out:
+                    out = out[:-1] + "𐑴"
+                out += apos.replace("'", apostrophe)
+                continue
+            befto = {
+                "have": "𐑨𐑓",
+                "has": "𐑨𐑕",
+                "used": "𐑕𐑑",
+                "unused": "𐑕𐑑",
+                "supposed": "𐑕𐑑",
+            }
+            if (
+                prev[0] in befto and low == "to"
+            ):  # If "to" changes the meaning of the preceding
+                i = out.rfind(tran[-2:])  # word, it also changes the pronunciation.
+                if i >= 0:
+                    out = out[:i] + befto[prev[0]] + out[i + 2 :]
+            if prev[0] == "lives" and low == "matter":
+                out = out[:-4] + "𐑤𐑲𐑝𐑟"
+            if token[0][0].isalnum():
+                out += " "
+            if (
+                prev[0] == "can"
+                and low == "not"
+                or prev[0] == "got"
+                and low == "ta"
+                or prev[0] == "lem"
+                and low == "me"
+                or prev[0] == "gim"
+                and low == "me"
+                or prev[0] == "gon"
+                and low == "na"
+                or prev[0] == "wan"
+                and low == "na"
+            ):
+                out = out[:-2]
+                token = (low, token[1])
+            for word in alpha_split(token[0]):
+                if word.find(".") + 1:  # "e.g.", "U.S.A.", etc.
+                    out += word
+                    continue
+                if initial and word[0].isalpha():
+                    initial = False
+                    if len(word) == 1 or word[1].islower():
+                        word = word[0].lower() + word[1:]
+                if word == "&":
+                    out += " 𐑯"
+                    continue
+                tran = ""
+                i = "dlo".find(word[0].lower())
+                if (
+                    i >= 0
+                    and len(word) > 1
+                    and word[1] == "'"
+                    and word.lower() != "o'er"
+                ):
+                    tran = "𐑛𐑤𐑴"[i] + apostrophe
+                    word = word[2:]
+                whole = word
+                root = prefix_split(word, token[1], 0)
+                tran += root[1] if root[1] else word
+                if tran.find("·") + 1:
+                    tran = "·" + tran.replace("·", "")
+                out += tran
+            prev = (low, token[1])
+        self.prev = prev
+        self.initial = initial
+        self.tran = tran
+        out += markup
+
+        out = out.replace("`` ", ' "').replace("``", '"')
+        out = out.replace(" ''", '" ').replace("''", '"')
+        for x in ["“", "‘", "(", "[", "{", "$"]:
+            out = out.replace(x + " ", " " + x)
+        self.write(out)
+
+
+def prepare(text):
+    text = text.replace("’", "'").replace("&#8217;", "'").replace("&rsquo;", "'")
+    return text.replace("'s", " 's").replace("'S", " 's")
+
+
+# Input is read a line at a time. HTML is written out block by block; plain
+# text (input without "<html" in its first 4 KB) paragraph by paragraph.
+def write(out):
+    sys.stdout.write(out)
+    sys.stdout.flush()
+
+
+shaver = Shaver(write)
+parser = MyHTMLParser(shaver)
+head = sys.stdin.read(4096)
+html = head.lower().find("<html") != -1
+lines = itertools.chain(io.StringIO(head + sys.stdin.readline()), sys.stdin)
+newlines = 0
+for line in lines:
+    if html:
+        parser.feed(prepare(line))
         continue
-    low = token[0].lower()
-    if low in cont:
-        apos = cont[low]
-        if low == "'s":
-            if "𐑐𐑑𐑒𐑓𐑔".find(out[-1]) + 1:
-                apos = "'𐑕"
-            if "𐑕𐑖𐑗𐑟𐑠𐑡".find(out[-1]) + 1:
-                apos = "'𐑩𐑟"
-        if prev[0] == "do" and low == "n't":
-            out = out[:-1] + "𐑴"
-        out += apos.replace("'", apostrophe)
+    if line == "\n":
+        newlines += 1
+        # Every pair of newlines is a paragraph break, as in "\n\n".
+        if newlines % 2 == 0:
+            parser.feed(" PARABREAK. ")
+            parser.flush()
+        else:
+            parser.feed(line)
         continue
-    befto = {"have": "𐑨𐑓", "has": "𐑨𐑕", "used": "𐑕𐑑", "unused": "𐑕𐑑", "supposed": "𐑕𐑑"}
-    if prev[0] in befto and low == "to":  # If "to" changes the meaning of the preceding
-        i = out.rfind(tran[-2:])  # word, it also changes the pronunciation.
-        out = out[:i] + befto[prev[0]] + out[i + 2 :]
-    if prev[0] == "lives" and low == "matter":
-        out = out[:-4] + "𐑤𐑲𐑝𐑟"
-    if token[0][0].isalnum():
-        out += " "
-    if (
-        prev[0] == "can"
-        and low == "not"
-        or prev[0] == "got"
-        and low == "ta"
-        or prev[0] == "lem"
-        and low == "me"
-        or prev[0] == "gim"
-        and low == "me"
-        or prev[0] == "gon"
-        and low == "na"
-        or prev[0] == "wan"
-        and low == "na"
-    ):
-        out = out[:-2]
-        token = (low, token[1])
-    for word in alpha_split(token[0]):
-        if word.find(".") + 1:  # "e.g.", "U.S.A.", etc.
-            out += word
-            continue
-        if initial and word[0].isalpha():
-            initial = False
-            if len(word) == 1 or word[1].islower():
-                word = word[0].lower() + word[1:]
-        if word == "&":
-            out += " 𐑯"
-            continue
-        tran = ""
-        i = "dlo".find(word[0].lower())
-        if i >= 0 and len(word) > 1 and word[1] == "'" and word.lower() != "o'er":
-            tran = "𐑛𐑤𐑴"[i] + apostrophe
-            word = word[2:]
-        whole = word
-        root = prefix_split(word, token[1], 0)
-        tran += root[1] if root[1] else word
-        if tran.find("·") + 1:
-            tran = "·" + tran.replace("·", "")
-        out += tran
-    prev = (low, token[1])
-
-out = out.replace("`` ", ' "').replace("``", '"')
-out = out.replace(" ''", '" ').replace("''", '"')
-for x in ["“", "‘", "(", "[", "{", "$"]:
-    out = out.replace(x + " ", " " + x)
-print(out)
+    newlines = 1 if line.endswith("\n") else 0
+    parser.feed(prepare(line))
+parser.close()
+parser.flush()
+# The final blank token ends the text as the whole-document version did.
+shaver([("", (" ", " "))])
+print()
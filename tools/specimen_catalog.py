@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Builds a catalog of specimen texts for all stage 4+ translations.
+
+For each translation, the preamble and article paragraphs are tokenized once
+into words, clauses, sentences and paragraphs, whose lengths are kept in
+NumPy arrays. For every (TextType, Size) bucket of the sample text sketch in
+`update_from_official_udhr.py` the candidate closest to the middle of the
+bucket's range is picked:
+
+    WORD       letters per word            SMALL 3-5    MEDIUM 6-8    LARGE 8-11
+    PHRASE     words per clause/sentence   SMALL 3-7    MEDIUM 8-14   LARGE 12-20
+    SENTENCE   words per sentence          SMALL 6-10   MEDIUM 12-20  LARGE 23-35
+    PARAGRAPH  words per paragraph         SMALL 10-20  MEDIUM 30-50  LARGE 70-100
+    PASSAGE    consecutive paragraphs      SMALL 2      MEDIUM 3      LARGE 5
+
+Scripts written without spaces between words are measured in letters, with
+the word ranges multiplied by `LETTERS_PER_WORD`. Their whitespace-separated
+tokens are whole clauses rather than words, so they get no WORD texts. The
+catalog is written to
+`build/specimens.json.gz`, keyed by translation key, with lookups by BCP 47
+tag and by script:
+
+    python specimen_catalog.py                                  # build
+    python specimen_catalog.py -q SENTENCE.SMALL PHRASE.LARGE   # query
+    python specimen_catalog.py -q SENTENCE.SMALL -s Deva -s Thai
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from lxml import etree
+
+from udhr_corpus import iter_paragraphs, read_catalog
+
+catalog_path = Path(Path(__file__).parent, "..", "build", "specimens.json.gz")
+
+CATALOG_VERSION = 1
+MIN_STAGE = 4
+LETTERS_PER_WORD = 3
+# Above this many letters per whitespace-separated token, a translation is
+# taken to be written without spaces between words.
+MAX_LETTERS_PER_TOKEN = 11
+# Word separators other than whitespace, e.g. the Ethiopic wordspace.
+WORD_SEPARATORS = str.maketrans({"\u1361": " "})
+
+BUCKETS = OrderedDict(
+    [
+        ("WORD.SMALL", (3, 5)),
+        ("WORD.MEDIUM", (6, 8)),
+        ("WORD.LARGE", (8, 11)),
+        ("PHRASE.SMALL", (3, 7)),
+        ("PHRASE.MEDIUM", (8, 14)),
+        ("PHRASE.LARGE", (12, 20)),
+        ("SENTENCE.SMALL", (6, 10)),
+        ("SENTENCE.MEDIUM", (12, 20)),
+        ("SENTENCE.LARGE", (23, 35)),
+        ("PARAGRAPH.SMALL", (10, 20)),
+        ("PARAGRAPH.MEDIUM", (30, 50)),
+        ("PARAGRAPH.LARGE", (70, 100)),
+        ("PASSAGE.SMALL", (2, 2)),
+        ("PASSAGE.MEDIUM", (3, 3)),
+        ("PASSAGE.LARGE", (5, 5)),
+    ]
+)
+
+SENTENCE_RE = re.compile(r"(?<=[.!?։؟۔।॥။።。！？])\s+|(?<=[。！？।॥])")
+CLAUSE_RE = re.compile(r"(?<=[,;:،؛፣፤、，；：])\s*")
+
+
+def letters(word):
+    """Returns the number of letters in word, not counting marks."""
+    return sum(1 for c in word if unicodedata.category(c)[0] in "LN")
+
+
+def _is_punct(c):
+    return unicodedata.category(c)[0] in "PS"
+
+
+def strip_punct(word):
+    start = 0
+    end = len(word)
+    while start < end and _is_punct(word[start]):
+        start += 1
+    while end > start and _is_punct(word[end - 1]):
+        end -= 1
+    return word[start:end]
+
+
+def words(text):
+    """Returns the whitespace-separated words of text without surrounding
+    punctuation."""
+    tokens = text.translate(WORD_SEPARATORS).split()
+    return [w for w in (strip_punct(w) for w in tokens) if w]
+
+
+class Tokens:
+    """The units of one translation with their lengths as NumPy arrays."""
+
+    def __init__(self, paragraphs):
+        # paragraphs: [(group, text)], group identifying the preamble/article
+        self.paragraphs = [text for _, text in paragraphs]
+        self.groups = np.array([g for g, _ in paragraphs], dtype=np.int32)
+        word_counts = np.array([len(words(t)) for t in self.paragraphs])
+        letter_counts = np.array([letters(t) for t in self.paragraphs])
+        self.spaced = bool(
+            letter_counts.sum() <= word_counts.sum() * MAX_LETTERS_PER_TOKEN
+        )
+        self.sentences = []
+        self.clauses = []
+        for text in self.paragraphs:
+            for sentence in SENTENCE_RE.split(text):
+                sentence = sentence.strip()
+                if sentence:
+                    self.sentences.append(sentence)
+                    self.clauses += [c.strip() for c in CLAUSE_RE.split(sentence)]
+        self.clauses = [c for c in self.clauses if c]
+        self.words = list(
+            OrderedDict.fromkeys(w for t in self.paragraphs for w in words(t))
+        )
+        self.word_letters = np.array([letters(w) for w in self.words])
+        self.sentence_len = self.length(self.sentences)
+        self.clause_len = self.length(self.clauses)
+        self.paragraph_len = word_counts if self.spaced else letter_counts
+
+    def length(self, texts):
+        if self.spaced:
+            return np.array([len(words(t)) for t in texts], dtype=np.int32)
+        return np.array([letters(t) for t in texts], dtype=np.int32)
+
+    def scale(self, lo, hi):
+        if self.spaced:
+            return lo, hi
+        return lo * LETTERS_PER_WORD, hi * LETTERS_PER_WORD
+
+    @staticmethod
+    def pick(lengths, lo, hi):
+        """Returns the index of the first length closest to the middle of
+        [lo, hi], or None."""
+        if not len(lengths):
+            return None
+        inside = (lengths >= lo) & (lengths <= hi)
+        if not inside.any():
+            return None
+        score = np.where(inside, np.abs(2 * lengths - lo - hi), np.iinfo(np.int32).max)
+        return int(np.argmin(score))
+
+    def passage(self, n):
+        """Returns the first n consecutive paragraphs of one article."""
+        if len(self.groups) < n:
+            return None
+        same = self.groups[n - 1 :] == self.groups[: len(self.groups) - n + 1]
+        starts = np.flatnonzero(same)
+        if not len(starts):
+            return None
+        i = int(starts[0])
+        return "\n".join(self.paragraphs[i : i + n])
+
+    def select(self):
+        """Returns {bucket: text} for the buckets with a candidate; WORD
+        buckets are only filled for scripts with spaces between words."""
+        texts = OrderedDict()
+        for bucket, (lo, hi) in BUCKETS.items():
+            kind = bucket.split(".")[0]
+            text = None
+            if kind == "WORD" and self.spaced:
+                i = self.pick(self.word_letters, lo, hi)
+                text = None if i is None else self.words[i]
+            elif kind == "PHRASE":
+                i = self.pick(self.clause_len, *self.scale(lo, hi))
+                text = None if i is None else self.clauses[i]
+            elif kind == "SENTENCE":
+                i = self.pick(self.sentence_len, *self.scale(lo, hi))
+                text = None if i is None else self.sentences[i]
+            elif kind == "PARAGRAPH":
+                i = self.pick(self.paragraph_len, *self.scale(lo, hi))
+                text = None if i is None else self.paragraphs[i]
+            elif kind == "PASSAGE":
+                text = self.passage(lo)
+            if text:
+                texts[bucket] = text
+        return texts
+
+
+def translation_paragraphs(path):
+    rows = []
+    for row in iter_paragraphs(path):
+        if row.section in ("preamble", "article") and row.para > 0 and row.text:
+            rows.append((row.article, row.text))
+    return rows
+
+
+def build(min_stage=MIN_STAGE):
+    """Returns the catalog of the translations with at least min_stage."""
+    keys = OrderedDict()
+    bcp47 = OrderedDict()
+    scripts = OrderedDict()
+    for entry in read_catalog():
+        if entry["stage"] < min_stage or entry["path"] is None:
+            continue
+        try:
+            paragraphs = translation_paragraphs(entry["path"])
+        except etree.XMLSyntaxError as e:
+            print(f"Skipping {entry['path']}: {e}", file=sys.stderr)
+            continue
+        if not paragraphs:
+            continue
+        tokens = Tokens(paragraphs)
+        keys[entry["f"]] = OrderedDict(
+            [
+                ("bcp47", entry["bcp47"]),
+                ("iso15924", entry["iso15924"]),
+                ("name", entry["n"]),
+                ("stage", entry["stage"]),
+                ("unit", "word" if tokens.spaced else "letter"),
+                ("texts", tokens.select()),
+            ]
+        )
+        if entry["bcp47"]:
+            bcp47.setdefault(entry["bcp47"], entry["f"])
+        scripts.setdefault(entry["iso15924"], []).append(entry["f"])
+    return {
+        "version": CATALOG_VERSION,
+        "buckets": list(BUCKETS),
+        "keys": keys,
+        "bcp47": bcp47,
+        "scripts": scripts,
+    }
+
+
+def save(catalog, path=catalog_path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load(path=catalog_path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        catalog = json.load(f)
+    if catalog.get("version") != CATALOG_VERSION:
+        raise ValueError(f"{path}: unsupported catalog version")
+    return catalog
+
+
+def lookup(catalog, buckets, scripts=None, tags=None):
+    """Yields (key, record, {bucket: text}) for the translations in scripts
+    and/or with the BCP 47 tags given (all if neither), that have a text for
+    every bucket. A translation matched by both a script and a tag is
+    yielded once."""
+    keys = list(catalog["keys"])
+    if scripts or tags:
+        keys = [k for s in scripts or [] for k in catalog["scripts"].get(s, [])]
+        keys += [catalog["bcp47"][t] for t in tags or [] if t in catalog["bcp47"]]
+    for key in OrderedDict.fromkeys(keys):
+        rec = catalog["keys"][key]
+        texts = rec["texts"]
+        if all(b in texts for b in buckets):
+            yield key, rec, OrderedDict((b, texts[b]) for b in buckets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-c", "--catalog", default=str(catalog_path))
+    parser.add_argument("--min-stage", type=int, default=MIN_STAGE)
+    parser.add_argument(
+        "-q", "--query", nargs="+", metavar="BUCKET", help="e.g. SENTENCE.SMALL"
+    )
+    parser.add_argument("-s", "--script", action="append", help="ISO 15924 code")
+    parser.add_argument("-l", "--lang", action="append", help="BCP 47 tag")
+    args = parser.parse_args()
+
+    if not args.query:
+        catalog = build(args.min_stage)
+        save(catalog, args.catalog)
+        filled = sum(len(rec["texts"]) for rec in catalog["keys"].values())
+        print(
+            f"{len(catalog['keys'])} translations, {filled} of "
+            f"{len(catalog['keys']) * len(BUCKETS)} buckets filled"
+        )
+        return
+    unknown = [b for b in args.query if b not in BUCKETS]
+    if unknown:
+        parser.error(f"unknown bucket {unknown[0]}, use one of {', '.join(BUCKETS)}")
+    catalog = load(args.catalog)
+    for key, rec, texts in lookup(catalog, args.query, args.script, args.lang):
+        for bucket, text in texts.items():
+            print(f"{key}\t{rec['bcp47']}\t{rec['iso15924']}\t{bucket}\t{text}")
+
+
+if __name__ == "__main__":
+    main()
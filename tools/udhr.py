@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Queries the catalog of all translations.
+
+The `index.xml` files of the corpus folders are compiled once into
+`build/catalog.json`, a list of plain entries with the location already
+split into numbers. The compiled catalog is rebuilt automatically when an
+`index.xml` is newer, and only then is lxml imported; a query itself just
+loads the JSON and filters a list, so the tool can be called in loops.
+
+Filters combine with AND; `--key`, `--lang` and `--ohchr` take shell-style
+patterns and all filters can be given more than once (OR).
+
+    python udhr.py --script Arab --dir rtl --min-stage 4
+    python udhr.py --lang und -o keys
+    python udhr.py --bbox 35,-10,60,30 -o json    # south,west,north,east
+    python udhr.py --build                         # recompile the catalog
+"""
+
+import argparse
+import json
+import sys
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+data_folder = Path(Path(__file__).parent, "..", "data")
+catalog_path = Path(Path(__file__).parent, "..", "build", "catalog.json")
+
+# Same as udhr_corpus.CORPUS_FOLDERS, which is not imported to keep lxml off
+# the query path.
+CORPUS_FOLDERS = ["udhr", "udhr-manual", "udhr-translit"]
+COLUMNS = ["f", "folder", "iso639-3", "bcp47", "iso15924", "dir", "stage", "n"]
+
+
+def index_mtime():
+    mtime = 0
+    for folder in CORPUS_FOLDERS:
+        path = Path(data_folder, folder, "index.xml")
+        if path.exists():
+            mtime = max(mtime, path.stat().st_mtime_ns)
+    return mtime
+
+
+def parse_loc(loc):
+    """Returns (latitude, longitude) of a "lat,lon" location, or None."""
+    try:
+        lat, lon = (float(v) for v in loc.split(","))
+    except ValueError:
+        return None
+    return lat, lon
+
+
+def build(path=catalog_path):
+    """Compiles the catalog of all corpus folders to path and returns its
+    entries."""
+    from udhr_corpus import read_catalog
+
+    entries = []
+    for entry in read_catalog():
+        rec = {k: v for k, v in entry.items() if k != "path"}
+        rec["doc"] = entry["path"] is not None
+        rec["latlon"] = parse_loc(entry["loc"])
+        entries.append(rec)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(path)
+    return entries
+
+
+def load(path=catalog_path, rebuild=False):
+    """Returns the compiled catalog, rebuilding it if it is missing or older
+    than an `index.xml`."""
+    path = Path(path)
+    try:
+        if not rebuild and path.stat().st_mtime_ns >= index_mtime():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    except FileNotFoundError:
+        pass
+    return build(path)
+
+
+def matches(value, patterns):
+    return any(fnmatchcase(value, p) for p in patterns)
+
+
+def query(
+    entries,
+    key=None,
+    lang=None,
+    script=None,
+    stage=None,
+    min_stage=None,
+    direction=None,
+    ohchr=None,
+    bbox=None,
+    folder=None,
+):
+    """Returns the entries that pass all given filters. key, lang and ohchr
+    are lists of patterns; lang matches the ISO 639-3 code, the BCP 47 tag
+    or its language subtag. script, stage, direction and folder are lists of
+    values; bbox is (south, west, north, east)."""
+    found = []
+    for e in entries:
+        if key and not matches(e["f"], key):
+            continue
+        if lang and not (
+            matches(e["iso639-3"], lang)
+            or matches(e["bcp47"], lang)
+            or matches(e["bcp47"].split("-")[0], lang)
+        ):
+            continue
+        if script and e["iso15924"] not in script:
+            continue
+        if stage and e["stage"] not in stage:
+            continue
+        if min_stage is not None and e["stage"] < min_stage:
+            continue
+        if direction and e["dir"] not in direction:
+            continue
+        if ohchr and not matches(e["ohchr"], ohchr):
+            continue
+        if folder and e["folder"] not in folder:
+            continue
+        if bbox:
+            if not e["latlon"]:
+                continue
+            lat, lon = e["latlon"]
+            south, west, north, east = bbox
+            if not south <= lat <= north:
+                continue
+            # A box with west > east crosses the antimeridian.
+            if west <= east and not west <= lon <= east:
+                continue
+            if west > east and east < lon < west:
+                continue
+        found.append(e)
+    return found
+
+
+def format_table(entries):
+    rows = [COLUMNS] + [[str(e[c]) for c in COLUMNS] for e in entries]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(COLUMNS) - 1)]
+    return "\n".join(
+        "  ".join(v.ljust(w) for v, w in zip(row, widths)) + "  " + row[-1]
+        for row in rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--key", action="append", help="key pattern")
+    parser.add_argument("-l", "--lang", action="append", help="language pattern")
+    parser.add_argument("-s", "--script", action="append", help="ISO 15924 code")
+    parser.add_argument("--stage", type=int, action="append")
+    parser.add_argument("--min-stage", type=int)
+    parser.add_argument("-d", "--dir", action="append", dest="direction")
+    parser.add_argument("--ohchr", action="append", help="OHCHR code pattern")
+    parser.add_argument(
+        "--bbox",
+        type=lambda s: tuple(float(v) for v in s.split(",")),
+        help="south,west,north,east",
+    )
+    parser.add_argument("--folder", action="append", choices=CORPUS_FOLDERS)
+    parser.add_argument(
+        "-o", "--output", choices=["table", "json", "keys"], default="table"
+    )
+    parser.add_argument("--build", action="store_true", help="recompile and exit")
+    args = parser.parse_args()
+    if args.bbox is not None and len(args.bbox) != 4:
+        parser.error("--bbox needs four numbers")
+
+    if args.build:
+        print(f"{len(build())} entries in {catalog_path.name}")
+        return
+    entries = load()
+    found = query(
+        entries,
+        key=args.key,
+        lang=args.lang,
+        script=args.script,
+        stage=args.stage,
+        min_stage=args.min_stage,
+        direction=args.direction,
+        ohchr=args.ohchr,
+        bbox=args.bbox,
+        folder=args.folder,
+    )
+    if args.output == "json":
+        json.dump(found, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    elif args.output == "keys":
+        for e in found:
+            print(e["f"])
+    elif found:
+        print(format_table(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Byte-offset index for reading single articles of a corpus document.
+
+For each document, a small sidecar file in `build/articles/FOLDER/` records
+the byte offset and length of the root start tag, the `<preamble>` element
+and every `<article number="N">` element of the file that is read (the
+canonical copy if there is one, see `udhr_corpus.canonical_path()`), along
+with its size and mtime. `UdhrArticleIndex.GetArticle(key, n)` reads the
+sidecar, seeks to the article and parses only that fragment, wrapped in the
+root start tag so namespaces and `xml:lang` are kept. Markup inside
+comments, CDATA sections and processing instructions is not indexed. An
+article number that occurs more than once (a numbering error in the source)
+keeps all its elements, in file order. A sidecar is rebuilt when the indexed
+file changed.
+
+    python udhr_articles.py            # build outdated sidecars
+    python udhr_articles.py eng 25     # print article 25 of udhr_eng.xml
+"""
+
+import argparse
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import (
+    CORPUS_FOLDERS,
+    Paragraph,
+    canonical_path,
+    data_folder,
+    doc_path,
+    element_text,
+)
+
+articles_folder = Path(Path(__file__).parent, "..", "build", "articles")
+
+MAGIC = b"UDHRART2"
+# magic, size and mtime of the indexed file, number of entries
+HEADER = struct.Struct("<8sQqI")
+# article number (0 for the preamble, -1 for the root start tag), offset, length
+ENTRY = struct.Struct("<iQI")
+ROOT = -1
+PREAMBLE = 0
+
+# Comments, CDATA sections and processing instructions, or a start or end
+# tag of the root, the preamble or an article.
+TOKEN_RE = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>"
+    rb"|<(/?)(udhr|preamble|article)\b([^>]*)>",
+    re.S,
+)
+NUMBER_RE = re.compile(rb"\bnumber\s*=\s*[\"'](\d+)[\"']")
+
+
+def sidecar_path(path):
+    """Returns the sidecar of the corpus document at path."""
+    rel = Path(path).resolve().relative_to(data_folder.resolve())
+    return Path(articles_folder, rel).with_suffix(".idx")
+
+
+def scan(data):
+    """Returns [(number, offset, length)] of the root start tag, preamble and
+    articles in the document bytes data, in file order."""
+    entries = []
+    current = None  # (tag, number, offset, depth) of the open element
+    for m in TOKEN_RE.finditer(data):
+        closing, tag, attributes = m.groups()
+        if tag is None:
+            continue
+        if tag == b"udhr":
+            if not entries and not closing:
+                entries.append((ROOT, m.start(), m.end() - m.start()))
+            continue
+        if not entries:
+            raise ValueError(f"<{tag.decode()}> before the <udhr> root element")
+        if current is not None:
+            if tag == current[0]:
+                depth = current[3] + (-1 if closing else 1)
+                if depth == 0:
+                    if current[1] is not None:
+                        offset = current[2]
+                        entries.append((current[1], offset, m.end() - offset))
+                    current = None
+                else:
+                    current = current[:3] + (depth,)
+            continue
+        if closing:
+            raise ValueError(f"unmatched </{tag.decode()}> at byte {m.start()}")
+        if tag == b"preamble":
+            number = PREAMBLE
+        else:
+            n = NUMBER_RE.search(attributes)
+            number = int(n.group(1)) if n else None
+        if attributes.endswith(b"/"):
+            if number is not None:
+                entries.append((number, m.start(), m.end() - m.start()))
+        else:
+            current = (tag, number, m.start(), 1)
+    if not entries:
+        raise ValueError("no <udhr> root element")
+    if current is not None:
+        raise ValueError(f"unclosed <{current[0].decode()}> at byte {current[2]}")
+    return entries
+
+
+def build(path):
+    """Writes the sidecar of the document at path and returns its entries."""
+    source = canonical_path(path)
+    st = source.stat()
+    entries = scan(source.read_bytes())
+    out = sidecar_path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+    tmp.replace(out)
+    return entries
+
+
+def read_sidecar(path):
+    """Returns the entries of the sidecar of the document at path, or None if
+    it is missing or the indexed file changed."""
+    source = canonical_path(path)
+    try:
+        with open(sidecar_path(path), "rb") as f:
+            magic, size, mtime, count = HEADER.unpack(f.read(HEADER.size))
+            st = source.stat()
+            if magic != MAGIC or size != st.st_size or mtime != st.st_mtime_ns:
+                return None
+            data = f.read(ENTRY.size * count)
+    except (FileNotFoundError, struct.error):
+        return None
+    return [entry for entry in ENTRY.iter_unpack(data)]
+
+
+class UdhrArticleIndex:
+    def __init__(self, folders=CORPUS_FOLDERS):
+        self.folders = folders
+
+    def path(self, key):
+        """Returns the path of the document for key in the first folder that
+        has one, or None."""
+        for folder in self.folders:
+            path = doc_path(folder, key)
+            if path.exists():
+                return path
+        return None
+
+    def entries(self, key):
+        """Returns {number: [(offset, length)]} for the document of key, in
+        file order, rebuilding its sidecar if needed."""
+        path = self.path(key)
+        if path is None:
+            raise KeyError(key)
+        entries = read_sidecar(path)
+        if entries is None:
+            entries = build(path)
+        found = {}
+        for number, offset, length in entries:
+            found.setdefault(number, []).append((offset, length))
+        return found
+
+    def GetArticleNumbers(self, key):
+        """Returns the article numbers of key, with 0 for the preamble; a
+        number that occurs more than once is listed as often."""
+        return sorted(
+            n for n, spans in self.entries(key).items() if n != ROOT for _ in spans
+        )
+
+    def GetArticles(self, key, n):
+        """Returns all `<article number="n">` elements of key (the preamble if
+        n is 0), each parsed from its fragment alone, in file order."""
+        entries = self.entries(key)
+        if n not in entries:
+            return []
+        elements = []
+        with open(canonical_path(self.path(key)), "rb") as f:
+            f.seek(entries[ROOT][0][0])
+            root = f.read(entries[ROOT][0][1])
+            for offset, length in entries[n]:
+                f.seek(offset)
+                fragment = f.read(length)
+                elements.append(etree.fromstring(root + fragment + b"</udhr>")[0])
+        return elements
+
+    def GetArticle(self, key, n):
+        """Returns the first `<article number="n">` element of key (the
+        preamble if n is 0), or None if there is none."""
+        elements = self.GetArticles(key, n)
+        return elements[0] if elements else None
+
+    def GetArticleParagraphs(self, key, n):
+        """Returns the Paragraph rows of article n of key, as
+        `udhr_corpus.iter_paragraphs()` would yield them; with more than one
+        article n, the rows of each follow in file order."""
+        section = "preamble" if n == PREAMBLE else "article"
+        rows = []
+        for el in self.GetArticles(key, n):
+            para = 0
+            for child in el.iter("{*}title", "{*}para"):
+                if etree.QName(child).localname == "title":
+                    rows.append(Paragraph(section, n, 0, element_text(child)))
+                else:
+                    para += 1
+                    rows.append(Paragraph(section, n, para, element_text(child)))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("key", nargs="?", help="translation key")
+    parser.add_argument("article", nargs="?", type=int, help="0 for the preamble")
+    args = parser.parse_args()
+
+    if args.key is None:
+        built = 0
+        for folder in CORPUS_FOLDERS:
+            for path in sorted(Path(data_folder, folder).glob("udhr_*.xml")):
+                if read_sidecar(path) is not None:
+                    continue
+                try:
+                    build(path)
+                except ValueError as e:
+                    print(f"{os.path.relpath(path)}: {e}", file=sys.stderr)
+                    continue
+                built += 1
+        print(f"{built} sidecars built")
+        return
+    index = UdhrArticleIndex()
+    if args.article is None:
+        print(" ".join(str(n) for n in index.GetArticleNumbers(args.key)))
+        return
+    for row in index.GetArticleParagraphs(args.key, args.article):
+        print(f"{row.para}\t{row.text}")
+
+
+if __name__ == "__main__":
+    main()
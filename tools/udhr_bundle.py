@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Packs the corpus into one zstd bundle and reads translations from it.
+
+The documents of the corpus repeat the same markup and attributes, so each
+file is compressed on its own with zstd against a shared dictionary trained
+on all documents. This keeps the ratio close to compressing the whole corpus
+as one stream while any single file still decompresses on its own. The
+bundle is one file:
+
+    header     magic, member count, dictionary size, size of the names
+    dictionary the trained zstd dictionary
+    names      JSON list of member names, "FOLDER/NAME"
+    entries    per member: offset, compressed size, size, CRC-32 (ENTRY)
+    data       the compressed members, back to back
+
+Members are the `index.xml`, `udhr_KEY.xml` and `status_KEY.xml` files of
+the corpus folders, the `status_KEY.xml` files of `data/status` (named
+`status/status_KEY.xml`) and the `EXTRA_FILES`. `UdhrBundle` maps the file
+and decompresses a member only when it is asked for. It has the reading
+methods of `udhr_zip.UdhrArchive` for one corpus folder, so it can be passed
+wherever the loaders take an archive (see `open_archive()`), and
+`read_catalog()` for all folders.
+
+    python udhr_bundle.py                      # build build/udhr.bundle
+    python udhr_bundle.py --key fra            # print one translation
+    python udhr_bundle.py --list
+"""
+
+import argparse
+import fnmatch
+import io
+import json
+import mmap
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import zstandard
+from lxml import etree
+
+from udhr_corpus import (
+    CORPUS_FOLDERS,
+    INDEX_XML,
+    data_folder,
+    doc_attributes,
+    iter_paragraphs,
+    parse_index,
+)
+from udhr_status import status_folder
+from udhr_zip import MEMBER_PATTERNS, STATUS_PATTERN, UdhrArchive
+
+repo_folder = Path(Path(__file__).parent, "..")
+bundle_path = Path(repo_folder, "build", "udhr.bundle")
+
+EXTRA_FILES = ["merged/udhr-art1-omniglot7.yaml"]
+
+MAGIC = b"UDHRZST1"
+HEADER = struct.Struct("<8sIII")
+# offset in the file, compressed size, size, CRC-32 of the uncompressed data
+ENTRY = struct.Struct("<QIII")
+
+DICT_SIZE = 1 << 17
+LEVEL = 19
+
+
+def corpus_files(folders=CORPUS_FOLDERS, extra=EXTRA_FILES, status=status_folder):
+    """Returns [(member name, path)] of the files to bundle."""
+    files = []
+    for folder in folders:
+        for path in sorted(Path(data_folder, folder).iterdir()):
+            if any(fnmatch.fnmatchcase(path.name, p) for p in MEMBER_PATTERNS):
+                files.append((f"{folder}/{path.name}", path))
+    status = Path(status)
+    for path in sorted(status.glob(STATUS_PATTERN)):
+        files.append((f"{status.name}/{path.name}", path))
+    for name in extra:
+        path = Path(repo_folder, name)
+        if path.exists():
+            files.append((name, path))
+    return files
+
+
+def build(path=bundle_path, files=None, dict_size=DICT_SIZE, level=LEVEL):
+    """Writes the bundle of files ([(member name, path)]) to path and returns
+    (members, uncompressed size, bundle size)."""
+    files = corpus_files() if files is None else files
+    contents = [p.read_bytes() for _, p in files]
+    samples = [
+        data for (name, _), data in zip(files, contents) if name.endswith(".xml")
+    ]
+    dictionary = zstandard.train_dictionary(dict_size, samples, level=level)
+    compressor = zstandard.ZstdCompressor(
+        level=level, dict_data=dictionary, write_content_size=True
+    )
+    blobs = [compressor.compress(data) for data in contents]
+    dict_data = dictionary.as_bytes()
+    names = json.dumps([name for name, _ in files], ensure_ascii=False).encode("utf-8")
+    offset = HEADER.size + len(dict_data) + len(names) + ENTRY.size * len(files)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(files), len(dict_data), len(names)))
+        f.write(dict_data)
+        f.write(names)
+        for data, blob in zip(contents, blobs):
+            f.write(ENTRY.pack(offset, len(blob), len(data), zlib.crc32(data)))
+            offset += len(blob)
+        for blob in blobs:
+            f.write(blob)
+    tmp.replace(path)
+    return len(files), sum(len(data) for data in contents), path.stat().st_size
+
+
+class UdhrBundle:
+    def __init__(self, path=bundle_path, folder="udhr"):
+        self.path = Path(path)
+        self.folder = folder
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, dict_size, names_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a UDHR bundle")
+        pos = HEADER.size
+        dictionary = zstandard.ZstdCompressionDict(self._mmap[pos : pos + dict_size])
+        pos += dict_size
+        names = json.loads(self._mmap[pos : pos + names_size])
+        pos += names_size
+        self.entries = {
+            name: ENTRY.unpack_from(self._mmap, pos + i * ENTRY.size)
+            for i, name in enumerate(names)
+        }
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        self._index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def _member(self, name):
+        return name if "/" in name else f"{self.folder}/{name}"
+
+    def __contains__(self, name):
+        return self._member(name) in self.entries
+
+    def keys(self, folder=None):
+        """Returns the keys of the `udhr_KEY.xml` documents of folder (by
+        default the bundle's folder)."""
+        prefix = f"{folder or self.folder}/udhr_"
+        return sorted(
+            name[len(prefix) : -len(".xml")]
+            for name in self.entries
+            if name.startswith(prefix)
+        )
+
+    def read(self, name):
+        """Returns the bytes of a member: "FOLDER/NAME", or a file name in the
+        bundle's folder."""
+        offset, size, _, _ = self.entries[self._member(name)]
+        return self._decompressor.decompress(self._mmap[offset : offset + size])
+
+    def open(self, name):
+        return io.BytesIO(self.read(name))
+
+    def doc_name(self, key):
+        return f"udhr_{key}.xml"
+
+    def read_index(self, folder=None):
+        """Returns the catalog entries of the `index.xml` of folder (by
+        default the bundle's folder), like `udhr_corpus.read_index()`, with
+        "member" instead of "path"."""
+        folder = folder or self.folder
+        if folder not in self._index:
+            with self.open(f"{folder}/{INDEX_XML}") as f:
+                entries = parse_index(f, folder)
+            for entry in entries:
+                name = f"{folder}/{self.doc_name(entry['f'])}"
+                entry["member"] = name if name in self.entries else None
+            self._index[folder] = entries
+        return self._index[folder]
+
+    def read_catalog(self, folders=CORPUS_FOLDERS):
+        """Returns the catalog entries of all folders, like
+        `udhr_corpus.read_catalog()`."""
+        entries = []
+        for folder in folders:
+            seen = set()
+            for entry in self.read_index(folder):
+                if entry["f"] not in seen:
+                    seen.add(entry["f"])
+                    entries.append(entry)
+        return entries
+
+    def parse(self, key, folder=None):
+        """Returns the parsed tree of the document for key, or None if the
+        bundle has no such document."""
+        name = f"{folder or self.folder}/{self.doc_name(key)}"
+        if name not in self.entries:
+            return None
+        return etree.parse(self.open(name))
+
+    def iter_paragraphs(self, key, folder=None):
+        """Yields the Paragraph rows of the document for key."""
+        yield from iter_paragraphs(
+            self.open(f"{folder or self.folder}/{self.doc_name(key)}")
+        )
+
+    def doc_attributes(self, key, folder=None):
+        return doc_attributes(
+            self.open(f"{folder or self.folder}/{self.doc_name(key)}")
+        )
+
+
+def open_archive(path, folder="udhr"):
+    """Returns a `UdhrBundle` or `udhr_zip.UdhrArchive` for the file at
+    path, depending on its format."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return UdhrBundle(path, folder)
+    return UdhrArchive(path, folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-f", "--file", default=str(bundle_path))
+    parser.add_argument("-d", "--folder", default="udhr", help="corpus folder")
+    parser.add_argument("--key", help="print the paragraphs of one translation")
+    parser.add_argument("--list", action="store_true", help="list the members")
+    args = parser.parse_args()
+
+    if not args.key and not args.list:
+        count, size, bundle_size = build(args.file)
+        print(
+            f"{count} files, {size} bytes in {bundle_size} bytes "
+            f"({size / bundle_size:.1f}x)"
+        )
+        return
+    with UdhrBundle(args.file, args.folder) as bundle:
+        if args.list:
+            for name, (_, csize, size, _) in bundle.entries.items():
+                print(f"{size:9} {csize:8} {name}")
+            return
+        if args.key not in bundle.keys():
+            print(f"{args.key} is not in {args.file}", file=sys.stderr)
+            sys.exit(1)
+        for row in bundle.iter_paragraphs(args.key):
+            print(f"{row.section}\t{row.article}\t{row.para}\t{row.text}")
+
+
+if __name__ == "__main__":
+    main()
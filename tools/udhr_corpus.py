@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Shared helpers for reading the UDHR corpus in `data/`.
+
+The corpus consists of several folders, each with an `index.xml` catalog and
+one `udhr_KEY.xml` document per translation. `read_catalog()` returns the
+catalog entries of all folders, `iter_paragraphs()` streams the text of one
+document as (section, article, para, text) rows.
+
+Documents are read from their canonical copy in `build/canonical/` when
+`canonicalize_udhr.py` has written one that is newer than the source.
+
+Rows use these sections: "title" for the document title, "preamble",
+"article" and "note". Within a section, para 0 is the heading (the preamble
+or article title) and paragraphs are numbered from 1, including the clauses
+of ordered lists. Preamble, title and notes outside articles use article 0.
+"""
+
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+from lxml import etree
+
+data_folder = Path(Path(__file__).parent, "..", "data")
+canonical_folder = Path(Path(__file__).parent, "..", "build", "canonical")
+
+CORPUS_FOLDERS = ["udhr", "udhr-manual", "udhr-translit"]
+INDEX_XML = "index.xml"
+
+# Catalog attributes in the order they appear in `index.xml`.
+INDEX_ATTRIBUTES = [
+    "f",
+    "iso639-3",
+    "iso15924",
+    "bcp47",
+    "dir",
+    "ohchr",
+    "stage",
+    "notes",
+    "loc",
+    "demo",
+    "n",
+]
+
+Paragraph = namedtuple("Paragraph", ["section", "article", "para", "text"])
+
+
+def doc_path(folder, key):
+    """Returns the path of the document for key in folder."""
+    return Path(data_folder, folder, f"udhr_{key}.xml")
+
+
+def canonical_path(path):
+    """Returns the canonical copy of the corpus document at path if it exists
+    and is not older than the document, else path."""
+    path = Path(path)
+    try:
+        rel = path.resolve().relative_to(data_folder.resolve())
+    except ValueError:
+        return path
+    canon = Path(canonical_folder, rel)
+    try:
+        if canon.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return canon
+    except FileNotFoundError:
+        pass
+    return path
+
+
+def parse_index(source, folder):
+    """Returns the entries of the `index.xml` file (or binary file object)
+    source as a list of dicts, each also carrying the "folder" name."""
+    entries = []
+    root = etree.parse(source).getroot()
+    for el in root.iter("{*}udhr"):
+        entry = OrderedDict((name, el.get(name, "")) for name in INDEX_ATTRIBUTES)
+        entry["stage"] = int(entry["stage"] or 0)
+        entry["folder"] = folder
+        entries.append(entry)
+    return entries
+
+
+def read_index(folder):
+    """Returns the entries of `index.xml` in folder as a list of dicts. Each
+    entry also carries the "folder" name and the document "path", which is
+    None if the translation has no document."""
+    entries = parse_index(str(Path(data_folder, folder, INDEX_XML)), folder)
+    for entry in entries:
+        path = doc_path(folder, entry["f"])
+        entry["path"] = path if path.exists() else None
+    return entries
+
+
+def read_catalog(folders=CORPUS_FOLDERS):
+    """Returns the catalog entries of all folders, with the first entry kept
+    when a folder lists a key more than once."""
+    entries = []
+    for folder in folders:
+        seen = set()
+        for entry in read_index(folder):
+            if entry["f"] in seen:
+                continue
+            seen.add(entry["f"])
+            entries.append(entry)
+    return entries
+
+
+def element_text(el):
+    """Returns the text of el including inline children, with whitespace
+    collapsed."""
+    return " ".join("".join(el.itertext()).split())
+
+
+def _source(path):
+    if isinstance(path, (str, Path)):
+        return str(canonical_path(path))
+    return path
+
+
+def iter_paragraphs(path):
+    """Yields the Paragraph rows of the document at path, which can also be a
+    binary file object."""
+    section = None
+    article = 0
+    para = 0
+    outer = []
+    for event, el in etree.iterparse(_source(path), events=("start", "end")):
+        tag = etree.QName(el).localname
+        if event == "start":
+            if tag in ("preamble", "article", "note"):
+                outer.append((section, para))
+                section = tag
+                para = 0
+                if tag == "article":
+                    article = int(el.get("number"))
+            continue
+        if tag == "title":
+            if section is None:
+                yield Paragraph("title", 0, 0, element_text(el))
+            else:
+                yield Paragraph(section, article, 0, element_text(el))
+        elif tag == "para":
+            para += 1
+            yield Paragraph(section or "note", article, para, element_text(el))
+        elif tag in ("preamble", "article", "note"):
+            section, para = outer.pop()
+            if tag == "article":
+                article = 0
+            el.clear()
+
+
+def doc_attributes(path):
+    """Returns the attributes of the root element of the document at path (or
+    binary file object), with `xml:lang` as "xml:lang"."""
+    for _, el in etree.iterparse(_source(path), events=("start",)):
+        attrib = OrderedDict()
+        for name, value in el.attrib.items():
+            if name == "{http://www.w3.org/XML/1998/namespace}lang":
+                name = "xml:lang"
+            attrib[name] = value
+        return attrib
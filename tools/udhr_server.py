@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Serves the corpus as a read-only JSON HTTP API.
+
+The corpus is loaded once at startup, from the bundle of `udhr_bundle.py`
+if there is one and from `data/` otherwise, and every response is
+serialized in advance: JSON body, gzip-compressed body and an ETag from the
+hash of the body (with a `-gz` suffix for the gzip body). Answering a
+request is then a dictionary lookup and a socket write, so one process on
+one core serves thousands of requests per second. Requests whose
+`If-None-Match` lists the ETag of the body they would get, or `*`, get
+`304 Not Modified`.
+
+    GET /translations                      catalog of all translations
+    GET /translations/{key}                one translation, all paragraphs
+    GET /translations/{key}/articles/{n}   one article (0 is the preamble)
+    GET /search?lang=de&script=Latn&q=...  catalog entries by language
+                                           (ISO 639-3 code, BCP 47 tag or
+                                           language subtag), script (ISO
+                                           15924 code) and text
+                                           (case-insensitive)
+
+The server speaks plain HTTP/1.1 with keep-alive on asyncio streams and
+only answers GET and HEAD.
+
+    python udhr_server.py                  # http://127.0.0.1:8948/
+    python udhr_server.py --port 8080 --data
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import sys
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from lxml import etree
+
+from udhr_bundle import UdhrBundle, bundle_path
+from udhr_corpus import iter_paragraphs, read_catalog
+
+HOST = "127.0.0.1"
+PORT = 8948
+GZIP_LEVEL = 6
+SEARCH_CACHE = 1024
+MAX_HEADER = 16384
+CATALOG_FIELDS = [
+    "f",
+    "folder",
+    "iso639-3",
+    "iso15924",
+    "bcp47",
+    "dir",
+    "stage",
+    "ohchr",
+    "loc",
+    "n",
+]
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+class Response:
+    __slots__ = ("status", "body", "gzipped", "etag", "gzipped_etag")
+
+    def __init__(self, data, status=200):
+        self.status = status
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        self.body = self.body.encode("utf-8")
+        self.gzipped = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+        tag = hashlib.sha1(self.body).hexdigest()[:20]
+        self.etag = f'"{tag}"'
+        self.gzipped_etag = f'"{tag}-gz"'
+
+
+def error(status, message):
+    return Response({"error": message}, status)
+
+
+NOT_FOUND = error(404, "not found")
+
+
+def catalog_entry(entry):
+    return OrderedDict((name, entry[name]) for name in CATALOG_FIELDS)
+
+
+def load_corpus(bundle=None):
+    """Returns [(catalog entry, [Paragraph])] of all translations that have a
+    document, read from the bundle at path bundle or from `data/`."""
+    corpus = []
+    if bundle:
+        source = UdhrBundle(bundle)
+        entries = [e for e in source.read_catalog() if e["member"]]
+    else:
+        source = None
+        entries = [e for e in read_catalog() if e["path"] is not None]
+    seen = set()
+    for entry in entries:
+        if entry["f"] in seen:
+            continue
+        try:
+            if source is not None:
+                rows = list(source.iter_paragraphs(entry["f"], entry["folder"]))
+            else:
+                rows = list(iter_paragraphs(entry["path"]))
+        except etree.XMLSyntaxError as e:
+            print(f"Skipping {entry['folder']}/{entry['f']}: {e}", file=sys.stderr)
+            continue
+        seen.add(entry["f"])
+        corpus.append((entry, rows))
+    if source is not None:
+        source.close()
+    return corpus
+
+
+class Snapshot:
+    """The precomputed responses of one corpus version."""
+
+    def __init__(self, corpus):
+        self.routes = {}
+        self.entries = {}
+        self.by_lang = defaultdict(set)
+        self.by_script = defaultdict(set)
+        self.texts = {}
+        catalog = []
+        for entry, rows in corpus:
+            key = entry["f"]
+            meta = catalog_entry(entry)
+            catalog.append(meta)
+            self.entries[key] = meta
+            for code in (entry["iso639-3"], entry["bcp47"]):
+                if code:
+                    self.by_lang[code.lower()].add(key)
+            if entry["bcp47"]:
+                self.by_lang[entry["bcp47"].split("-")[0].lower()].add(key)
+            self.by_script[entry["iso15924"].lower()].add(key)
+            self.texts[key] = "\n".join(row.text for row in rows).casefold()
+            articles = defaultdict(list)
+            for row in rows:
+                articles[row.article].append(row)
+            paragraphs = [list(row) for row in rows]
+            self.routes[f"/translations/{key}"] = Response(
+                dict(meta, paragraphs=paragraphs)
+            )
+            for n, article_rows in articles.items():
+                self.routes[f"/translations/{key}/articles/{n}"] = Response(
+                    dict(
+                        meta,
+                        article=n,
+                        paragraphs=[list(row) for row in article_rows],
+                    )
+                )
+        self.routes["/translations"] = Response(catalog)
+        self.order = {key: i for i, key in enumerate(self.entries)}
+        self.search_cache = OrderedDict()
+
+    def search(self, query):
+        """Returns the response for the lang, script and q parameters of a
+        query string; responses are kept in an LRU cache. Translations match
+        any of the lang values, any of the script values and all of the q
+        values, which are searched in the text ignoring case."""
+        params = parse_qs(query)
+        lang = tuple(sorted(v.lower() for v in params.get("lang", [])))
+        script = tuple(sorted(v.lower() for v in params.get("script", [])))
+        text = tuple(sorted(v.casefold() for v in params.get("q", [])))
+        if not lang and not script and not text:
+            return error(400, "search needs lang, script or q")
+        cache_key = (lang, script, text)
+        response = self.search_cache.get(cache_key)
+        if response is not None:
+            self.search_cache.move_to_end(cache_key)
+            return response
+        keys = set(self.entries)
+        if lang:
+            keys &= set().union(*(self.by_lang.get(v, ()) for v in lang))
+        if script:
+            keys &= set().union(*(self.by_script.get(v, ()) for v in script))
+        for value in text:
+            keys = {k for k in keys if value in self.texts[k]}
+        response = Response(
+            [self.entries[k] for k in sorted(keys, key=self.order.__getitem__)]
+        )
+        self.search_cache[cache_key] = response
+        if len(self.search_cache) > SEARCH_CACHE:
+            self.search_cache.popitem(last=False)
+        return response
+
+    def get(self, target):
+        """Returns the response for a request target."""
+        parts = urlsplit(target)
+        path = unquote(parts.path).rstrip("/") or "/"
+        if path == "/search":
+            return self.search(parts.query)
+        return self.routes.get(path, NOT_FOUND)
+
+
+def parse_headers(lines):
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def etag_matches(value, etag):
+    """Returns whether the If-None-Match header value lists etag or is `*`.
+    The comparison is weak: a `W/` prefix is ignored."""
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def render(response, method, headers, keep_alive):
+    """Returns the bytes of the HTTP response to a request."""
+    status = response.status
+    body = response.body
+    extra = ""
+    if status == 200:
+        etag = response.etag
+        if "gzip" in headers.get("accept-encoding", ""):
+            body = response.gzipped
+            etag = response.gzipped_etag
+            extra = "Content-Encoding: gzip\r\n"
+        if etag_matches(headers.get("if-none-match", ""), etag):
+            status = 304
+            body = b""
+            extra = ""
+        extra += f"ETag: {etag}\r\nVary: Accept-Encoding\r\n"
+    if status != 304:
+        # A 304 has no body, and no Content-Length of the body it replaces.
+        extra = f"Content-Length: {len(body)}\r\n" + extra
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"{extra}"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    ).encode("latin-1")
+    if method == "HEAD" or status == 304:
+        return head
+    return head + body
+
+
+class Server:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    data = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    response = error(400, "header too large")
+                    writer.write(render(response, "GET", {}, False))
+                    break
+                lines = data.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    writer.write(render(error(400, "bad request"), "GET", {}, False))
+                    break
+                headers = parse_headers(lines[1:-2])
+                connection = headers.get("connection", "").lower()
+                if version == "HTTP/1.0":
+                    keep_alive = connection == "keep-alive"
+                else:
+                    keep_alive = connection != "close"
+                if method in ("GET", "HEAD"):
+                    response = self.snapshot.get(target)
+                else:
+                    # A request body is not read, so the connection ends.
+                    response = error(405, "method not allowed")
+                    keep_alive = False
+                writer.write(render(response, method, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        """Serves until cancelled; ready, if given, is called with the bound
+        (host, port)."""
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER)
+        if ready:
+            ready(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("--bundle", default=str(bundle_path), help="bundle file")
+    parser.add_argument("--data", action="store_true", help="read data/ instead")
+    args = parser.parse_args()
+
+    bundle = None if args.data or not Path(args.bundle).exists() else args.bundle
+    snapshot = Snapshot(load_corpus(bundle))
+    print(
+        f"{len(snapshot.entries)} translations, {len(snapshot.routes)} responses "
+        f"from {bundle or 'data/'}",
+        file=sys.stderr,
+    )
+
+    def ready(address):
+        print(f"Serving on http://{address[0]}:{address[1]}/", file=sys.stderr)
+
+    try:
+        asyncio.run(Server(snapshot).serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Index of the status and history of all translations.
+
+Each `status_KEY.xml` holds the current status text of a translation and its
+dated `<history-entry>` records, newest first. This tool parses all status
+files in a process pool into rows of
+
+    (key, date, raw date, from stage, to stage, text)
+
+with the dates normalized to ISO 8601 and stage transitions taken from
+entries that start with "stage N". The index is stored as gzipped JSON in
+`build/status_index.json.gz`; rebuilding only reparses files whose mtime
+changed.
+
+    python udhr_status.py                      # update the index
+    python udhr_status.py --since 2020-01-01   # stage changes since a date
+    python udhr_status.py --key fra            # history of one translation
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import CORPUS_FOLDERS, data_folder, read_catalog
+
+status_folder = Path(data_folder, "status")
+index_path = Path(Path(__file__).parent, "..", "build", "status_index.json.gz")
+
+INDEX_VERSION = 1
+STAGE_RE = re.compile(r"^\s*stage\s+(\d+)", re.IGNORECASE)
+DATE_FORMATS = ["%B %d, %Y", "%b %d, %Y", "%Y-%m-%d"]
+
+
+def status_files():
+    """Returns the status files of the corpus, keyed by translation key."""
+    paths = sorted(status_folder.glob("status_*.xml"))
+    for folder in CORPUS_FOLDERS:
+        paths += sorted(Path(data_folder, folder).glob("status_*.xml"))
+    return {p.stem[len("status_") :]: p for p in paths}
+
+
+def normalize_date(date):
+    """Returns date as YYYY-MM-DD, or None if it cannot be parsed."""
+    date = " ".join((date or "").split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def _text(el):
+    return " ".join("".join(el.itertext()).split())
+
+
+def parse_status_file(path):
+    """Returns {"status": text, "entries": [[date, raw date, from stage, to
+    stage, text], ...]} of a status file, with entries oldest first."""
+    root = etree.parse(str(path)).getroot()
+    status = []
+    for el in root.iterchildren():
+        if el.tag == "bridgehead" and el.get("id") == "history":
+            break
+        if el.tag == "para":
+            status.append(_text(el))
+    entries = []
+    for i, el in enumerate(root.iter("history-entry")):
+        raw = el.get("date", "")
+        entries.append((normalize_date(raw) or "", -i, raw, _text(el)))
+    entries.sort()
+    rows = []
+    stage = None
+    for date, _, raw, text in entries:
+        m = STAGE_RE.match(text)
+        to_stage = int(m.group(1)) if m else None
+        rows.append([date or None, raw, stage if m else None, to_stage, text])
+        if m:
+            stage = to_stage
+    return {"status": "\n".join(status), "entries": rows}
+
+
+def _parse(item):
+    key, path = item
+    return key, parse_status_file(path)
+
+
+class StatusIndex:
+    def __init__(self, path=index_path):
+        self.path = Path(path)
+        self.files = {}
+        self.keys = {}
+        if self.path.exists():
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.files = data["files"]
+                self.keys = data["keys"]
+
+    def update(self, workers=None):
+        """Reparses the status files whose mtime changed, in a process pool,
+        and saves the index. Returns the number of reparsed files."""
+        files = status_files()
+        todo = []
+        for key, path in files.items():
+            mtime = path.stat().st_mtime_ns
+            if self.files.get(key) != mtime or key not in self.keys:
+                todo.append((key, path))
+                self.files[key] = mtime
+        for key in list(self.keys):
+            if key not in files:
+                del self.keys[key]
+                self.files.pop(key, None)
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for key, rec in pool.map(_parse, todo, chunksize=16):
+                    self.keys[key] = rec
+        self.save()
+        return len(todo)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": INDEX_VERSION, "files": self.files, "keys": self.keys}
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def rows(self):
+        """Yields (key, date, raw date, from stage, to stage, text) rows."""
+        for key, rec in self.keys.items():
+            for row in rec["entries"]:
+                yield (key, *row)
+
+    def history(self, key):
+        return [(key, *row) for row in self.keys.get(key, {}).get("entries", [])]
+
+    def status(self, key):
+        return self.keys.get(key, {}).get("status")
+
+    def changed_since(self, date, stage_changes_only=True, catalog=None):
+        """Returns the rows dated on or after date (YYYY-MM-DD), newest first,
+        each joined with the catalog entry of its key (or None)."""
+        if catalog is None:
+            catalog = read_catalog()
+        entries = {}
+        for entry in catalog:
+            entries.setdefault(entry["f"], entry)
+        found = [
+            row
+            for row in self.rows()
+            if row[1]
+            and row[1] >= date
+            and (row[4] is not None or not stage_changes_only)
+        ]
+        found.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        return [(row, entries.get(row[0])) for row in found]
+
+    def stale(self, before, catalog=None):
+        """Returns the catalog entries whose latest history entry is older
+        than before (YYYY-MM-DD), oldest first."""
+        if catalog is None:
+            catalog = read_catalog()
+        stale = []
+        for entry in catalog:
+            dates = [row[0] for row in self.keys.get(entry["f"], {}).get("entries", [])]
+            latest = max((d for d in dates if d), default=None)
+            if latest is None or latest < before:
+                stale.append((latest, entry))
+        stale.sort(key=lambda item: item[0] or "")
+        return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-i", "--index", default=str(index_path))
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--since", help="list stage changes since YYYY-MM-DD")
+    parser.add_argument(
+        "--all", action="store_true", help="with --since, list all history entries"
+    )
+    parser.add_argument("--key", help="print the status and history of a key")
+    args = parser.parse_args()
+
+    index = StatusIndex(args.index)
+    n = index.update(args.jobs)
+    if not args.since and not args.key:
+        print(f"{n} status files parsed, {len(index.keys)} in index")
+    if args.since:
+        for row, entry in index.changed_since(args.since, not args.all):
+            name = entry["n"] if entry else ""
+            stage = entry["stage"] if entry else ""
+            print(f"{row[1]}  {row[0]:<16} {row[3]} -> {row[4]}  [{stage}] {name}")
+    if args.key:
+        print(index.status(args.key))
+        for row in index.history(args.key):
+            print(f"{row[1] or row[2]}  {row[5]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Compact memory-mapped string table of all corpus paragraphs.
+
+The table is one file with a header, a JSON list of translation keys, a
+fixed-width slot array and one UTF-8 blob of all paragraph texts:
+
+    header     magic, key and slot counts, size of the keys, offsets of the
+               slots and the blob
+    keys       JSON list of translation keys, in slot order
+    slots      per paragraph: translation, article, para, section,
+               blob offset, byte length (struct SLOT)
+    blob       the UTF-8 texts, back to back
+
+Slots are sorted by (translation, article, section, para), so the paragraphs
+of one translation or one article are a contiguous range found by binary
+search. `UdhrStringTable` opens the file with mmap and returns memoryview
+slices of the blob; text is only decoded when asked for. Several processes
+that open the same file share one page-cached copy.
+
+    python udhr_strtab.py                # build build/udhr.strtab
+    python udhr_strtab.py fra 1          # print article 1 of fra
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import iter_paragraphs, read_catalog
+
+strtab_path = Path(Path(__file__).parent, "..", "build", "udhr.strtab")
+
+MAGIC = b"UDHRSTR1"
+HEADER = struct.Struct("<8sIIQQQ")
+# translation index, article, para, section, blob offset, byte length
+SLOT = struct.Struct("<HBBBxxxQI")
+
+SECTIONS = ["title", "preamble", "article", "note"]
+
+
+def build(path=strtab_path):
+    """Writes the string table of all parsed documents to path."""
+    keys = []
+    slots = []
+    blob = bytearray()
+    seen = set()
+    for entry in read_catalog():
+        if entry["path"] is None or entry["f"] in seen:
+            continue
+        try:
+            paragraphs = list(iter_paragraphs(entry["path"]))
+        except etree.XMLSyntaxError as e:
+            print(f"Skipping {entry['path'].name}: {e}", file=sys.stderr)
+            continue
+        seen.add(entry["f"])
+        ti = len(keys)
+        keys.append(entry["f"])
+        for p in paragraphs:
+            data = p.text.encode("utf-8")
+            slots.append(
+                (ti, p.article, SECTIONS.index(p.section), p.para, len(blob), len(data))
+            )
+            blob += data
+    slots.sort(key=lambda s: (s[0], s[1], s[2], s[3]))
+    keys_data = json.dumps(keys, ensure_ascii=False).encode("utf-8")
+    slots_offset = HEADER.size + len(keys_data)
+    blob_offset = slots_offset + SLOT.size * len(slots)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, len(keys), len(slots), len(keys_data), slots_offset, blob_offset
+            )
+        )
+        f.write(keys_data)
+        for ti, article, section, para, offset, length in slots:
+            f.write(SLOT.pack(ti, article, para, section, offset, length))
+        f.write(blob)
+    tmp.replace(path)
+    return len(keys), len(slots), len(blob)
+
+
+class UdhrStringTable:
+    def __init__(self, path=strtab_path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, nkeys, nslots, keys_size, slots_offset, blob_offset = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a UDHR string table")
+        self.keys = json.loads(bytes(self._view[HEADER.size : HEADER.size + keys_size]))
+        self._key_index = {key: i for i, key in enumerate(self.keys)}
+        self._nslots = nslots
+        self._slots_offset = slots_offset
+        self._blob_offset = blob_offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._nslots
+
+    def close(self):
+        """Unmaps the file. If memoryview slices are still referenced, the
+        mapping stays alive until the last one is released."""
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def _slot(self, i):
+        return SLOT.unpack_from(self._mmap, self._slots_offset + i * SLOT.size)
+
+    def _sort_key(self, i):
+        ti, article, para, section, _, _ = self._slot(i)
+        return (ti, article, section, para)
+
+    def _lower_bound(self, target):
+        lo, hi = 0, self._nslots
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._sort_key(mid)[: len(target)] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _range(self, prefix):
+        start = self._lower_bound(prefix)
+        end = start
+        while end < self._nslots and self._sort_key(end)[: len(prefix)] == prefix:
+            end += 1
+        return start, end
+
+    def _bytes(self, i):
+        _, _, _, _, offset, length = self._slot(i)
+        start = self._blob_offset + offset
+        return self._view[start : start + length]
+
+    def GetParagraphs(self, key, article=None, section=None):
+        """Yields (section, article, para, memoryview) of a translation,
+        optionally limited to one article number and section."""
+        if key not in self._key_index:
+            raise KeyError(key)
+        prefix = (self._key_index[key],)
+        if article is not None:
+            prefix += (article,)
+            if section is not None:
+                prefix += (SECTIONS.index(section),)
+        start, end = self._range(prefix)
+        for i in range(start, end):
+            _, art, para, sec, _, _ = self._slot(i)
+            if section is not None and SECTIONS[sec] != section:
+                continue
+            yield SECTIONS[sec], art, para, self._bytes(i)
+
+    def GetParagraph(self, key, article, para, section="article"):
+        """Returns the memoryview of one paragraph, or None."""
+        if key not in self._key_index:
+            return None
+        target = (self._key_index[key], article, SECTIONS.index(section), para)
+        i = self._lower_bound(target)
+        if i < self._nslots and self._sort_key(i) == target:
+            return self._bytes(i)
+        return None
+
+    def GetText(self, key, article, para, section="article"):
+        """Returns the decoded text of one paragraph, or None."""
+        data = self.GetParagraph(key, article, para, section)
+        return None if data is None else str(data, "utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-f", "--file", default=str(strtab_path))
+    parser.add_argument("key", nargs="?", help="print the paragraphs of this key")
+    parser.add_argument("article", nargs="?", type=int)
+    args = parser.parse_args()
+    if not args.key:
+        keys, slots, size = build(args.file)
+        print(f"{keys} translations, {slots} paragraphs, {size} bytes of text")
+        return
+    with UdhrStringTable(args.file) as table:
+        for section, article, para, data in table.GetParagraphs(args.key, args.article):
+            print(section, article, para, str(data, "utf-8"))
+
+
+if __name__ == "__main__":
+    main()
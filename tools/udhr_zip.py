@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Reads the corpus directly from an upstream UDHR zip archive.
+
+The archive published at https://unicode.org/udhr/ (`udhr_xml.zip`) holds
+`index.xml`, the `udhr_KEY.xml` documents and the `status_KEY.xml` files,
+possibly below a top-level folder. `UdhrArchive` indexes the central
+directory of the archive once, by file name, and parses single members on
+demand from the compressed stream, without extracting anything.
+
+`diff()` compares the archive with the working tree using the CRC-32 and
+size recorded in the central directory, so the archive members are not
+decompressed; only the changed members are read by `sync()`. `index.xml` and
+the documents are compared with `data/udhr`, the status files with
+`data/status`, where the repository keeps them.
+
+    python udhr_zip.py udhr_xml.zip             # list changes
+    python udhr_zip.py udhr_xml.zip --sync      # write them to data/
+    python udhr_zip.py udhr_xml.zip --key fra   # print one translation
+"""
+
+import argparse
+import fnmatch
+import sys
+import zipfile
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import (
+    INDEX_XML,
+    data_folder,
+    doc_attributes,
+    iter_paragraphs,
+    parse_index,
+)
+from udhr_status import status_folder
+
+STATUS_PATTERN = "status_*.xml"
+MEMBER_PATTERNS = [INDEX_XML, "udhr_*.xml", STATUS_PATTERN]
+
+ArchiveDiff = namedtuple("ArchiveDiff", ["added", "removed", "changed"])
+
+
+def file_crc(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+class UdhrArchive:
+    def __init__(self, path, folder="udhr"):
+        self.path = Path(path)
+        self.folder = folder
+        self._zip = zipfile.ZipFile(self.path)
+        self.members = {}
+        for info in self._zip.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename.rsplit("/", 1)[-1]
+            if any(fnmatch.fnmatchcase(name, p) for p in MEMBER_PATTERNS):
+                self.members.setdefault(name, info)
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def keys(self):
+        """Returns the keys of the `udhr_KEY.xml` documents in the archive."""
+        return sorted(
+            name[len("udhr_") : -len(".xml")]
+            for name in self.members
+            if name.startswith("udhr_")
+        )
+
+    def open(self, name):
+        """Returns a binary stream of the member name, decompressed as it is
+        read."""
+        return self._zip.open(self.members[name])
+
+    def read(self, name):
+        return self._zip.read(self.members[name])
+
+    def doc_name(self, key):
+        return f"udhr_{key}.xml"
+
+    def read_index(self):
+        """Returns the catalog entries of the archive's `index.xml`, like
+        `udhr_corpus.read_index()`, with "member" instead of "path"."""
+        if self._index is None:
+            with self.open(INDEX_XML) as f:
+                self._index = parse_index(f, self.folder)
+            for entry in self._index:
+                name = self.doc_name(entry["f"])
+                entry["member"] = name if name in self.members else None
+        return self._index
+
+    def parse(self, key):
+        """Returns the parsed tree of the document for key, or None if the
+        archive has no such document."""
+        name = self.doc_name(key)
+        if name not in self.members:
+            return None
+        with self.open(name) as f:
+            return etree.parse(f)
+
+    def iter_paragraphs(self, key):
+        """Yields the Paragraph rows of the document for key."""
+        with self.open(self.doc_name(key)) as f:
+            yield from iter_paragraphs(f)
+
+    def doc_attributes(self, key):
+        with self.open(self.doc_name(key)) as f:
+            return doc_attributes(f)
+
+    def local_folders(self, folder=None, status=None):
+        """Returns {member pattern: working tree folder}: folder (by default
+        `data/FOLDER`) for `index.xml` and the documents, status (by default
+        `data/status`) for the status files."""
+        folder = Path(folder or Path(data_folder, self.folder))
+        status = Path(status or status_folder)
+        return {p: status if p == STATUS_PATTERN else folder for p in MEMBER_PATTERNS}
+
+    def local_path(self, name, folders):
+        for pattern, folder in folders.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return Path(folder, name)
+        return None
+
+    def diff(self, folder=None, status=None):
+        """Compares the archive with the working tree (see local_folders())
+        and returns the member names that were added, removed or changed in
+        the archive."""
+        local = {}
+        for pattern, base in self.local_folders(folder, status).items():
+            for path in base.glob(pattern):
+                local[path.name] = path
+        added = sorted(name for name in self.members if name not in local)
+        removed = sorted(name for name in local if name not in self.members)
+        changed = []
+        for name, info in sorted(self.members.items()):
+            path = local.get(name)
+            if path is None:
+                continue
+            if path.stat().st_size != info.file_size or file_crc(path) != info.CRC:
+                changed.append(name)
+        return ArchiveDiff(added, removed, changed)
+
+    def sync(self, folder=None, status=None, delete=False):
+        """Writes the added and changed members to the working tree and
+        returns the diff. Removed files are deleted only if delete is True."""
+        folders = self.local_folders(folder, status)
+        diff = self.diff(folder, status)
+        for name in diff.added + diff.changed:
+            out = self.local_path(name, folders)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_suffix(".tmp")
+            tmp.write_bytes(self.read(name))
+            tmp.replace(out)
+        if delete:
+            for name in diff.removed:
+                self.local_path(name, folders).unlink()
+        return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("archive", help="upstream UDHR zip archive")
+    parser.add_argument("-d", "--folder", default="udhr", help="corpus folder")
+    parser.add_argument(
+        "--sync", action="store_true", help="write added and changed files"
+    )
+    parser.add_argument(
+        "--delete", action="store_true", help="with --sync, delete removed files"
+    )
+    parser.add_argument("--key", help="print the paragraphs of one translation")
+    args = parser.parse_args()
+
+    with UdhrArchive(args.archive, args.folder) as archive:
+        if args.key:
+            if archive.doc_name(args.key) not in archive:
+                print(f"{args.key} is not in {args.archive}", file=sys.stderr)
+                sys.exit(1)
+            for row in archive.iter_paragraphs(args.key):
+                print(f"{row.section}\t{row.article}\t{row.para}\t{row.text}")
+            return
+        if args.sync:
+            diff = archive.sync(delete=args.delete)
+        else:
+            diff = archive.diff()
+        for label, names in zip(("A", "D", "M"), diff):
+            for name in names:
+                print(f"{label} {name}")
+        print(
+            f"{len(diff.added)} added, {len(diff.removed)} removed, "
+            f"{len(diff.changed)} changed",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
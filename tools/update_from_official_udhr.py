@@ -10,11 +10,14 @@ See more at https://www.unicode.org/udhr.
 
 import enum
 import os
-from collections import OrderedDict
+import sys
+from collections import OrderedDict, namedtuple
 from pathlib import Path
 
 from lxml import etree
 
+from udhr_corpus import canonical_path
+
 # udhr_folder = str(Path(Path(__file__).parent, '..', 'data', 'udhr'))
 # SOURCE = 'https://unicode.org/udhr/'
 # outpath = str(Path(Path(__file__).parent, 'udhr_art1_official.yaml'))
@@ -26,9 +29,22 @@ outpath = str(Path(Path(__file__).parent, "udhr_art1_r12a.yaml"))
 INDEX_XML = "index.xml"
 
 
+def intern_code(value):
+    """Interns an attribute value; codes repeat across translations and
+    corpus versions."""
+    return None if value is None else sys.intern(value)
+
+
 class UdhrTranslations:
-    def __init__(self):
+    def __init__(self, archive=None):
+        """Reads the translations from udhr_folder, or from the upstream zip
+        archive or `udhr_bundle.py` bundle at path archive if given."""
         self._zip_dir = udhr_folder
+        self._archive = None
+        if archive:
+            from udhr_bundle import open_archive
+
+            self._archive = open_archive(archive, Path(udhr_folder).name)
         self._udhrs = self._ParseUdhrs()
         self._udhr_map = {}
 
@@ -43,17 +59,24 @@ class UdhrTranslations:
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._zip_dir.cleanup()
+        if self._archive is not None:
+            self._archive.close()
 
     def _ParseUdhrs(self):
-        root = etree.parse(os.path.join(self._zip_dir, INDEX_XML))
+        if self._archive is not None:
+            with self._archive.open(INDEX_XML) as f:
+                root = etree.parse(f)
+        else:
+            root = etree.parse(os.path.join(self._zip_dir, INDEX_XML))
         return [self.Udhr(udhr_data, self._zip_dir) for udhr_data in root.xpath("*")]
 
     def _LoadUdhrTranslation(self, udhr):
+        if self._archive is not None:
+            return self._archive.parse(udhr.key)
         filename = f"udhr_{udhr.key}.xml"
         path = os.path.join(self._zip_dir, filename)
         if os.path.exists(path):
-            return etree.parse(path)
+            return etree.parse(str(canonical_path(path)))
         return None
 
     def GetUdhrs(self, min_stage=0):
@@ -67,23 +90,58 @@ class UdhrTranslations:
             return None
         return self._udhr_map[lang_code]
 
+    class Article(namedtuple("Article", ["id", "title", "content"])):
+        """An article (or the preamble, with id 0) as a tuple with the
+        paragraphs as a tuple of strings. Items can also be read by name, as
+        when articles were dicts."""
+
+        __slots__ = ()
+
+        def __getitem__(self, item):
+            if isinstance(item, str):
+                if item not in self._fields:
+                    raise KeyError(item)
+                return getattr(self, item)
+            return tuple.__getitem__(self, item)
+
+        def get(self, name, default=None):
+            return getattr(self, name) if name in self._fields else default
+
     class Udhr:
+        __slots__ = (
+            "key",
+            "iso639_3",
+            "iso15924",
+            "bcp47",
+            "direction",
+            "ohchr",
+            "stage",
+            "loc",
+            "name",
+            "title",
+            "preamble",
+            "articles",
+        )
+
         def __init__(self, udhr_data, zip_dir):
-            self.key = udhr_data.get("f")
-            self.iso639_3 = udhr_data.get("iso639-3")
-            self.iso15924 = udhr_data.get("iso15924")
-            self.bcp47 = udhr_data.get("bcp47")
-            self.direction = udhr_data.get("dir")
-            self.ohchr = udhr_data.get("ohchr")
+            self.key = intern_code(udhr_data.get("f"))
+            self.iso639_3 = intern_code(udhr_data.get("iso639-3"))
+            self.iso15924 = intern_code(udhr_data.get("iso15924"))
+            self.bcp47 = intern_code(udhr_data.get("bcp47"))
+            self.direction = intern_code(udhr_data.get("dir"))
+            self.ohchr = intern_code(udhr_data.get("ohchr"))
             self.stage = int(udhr_data.get("stage"))
-            self.loc = udhr_data.get("loc")
+            self.loc = intern_code(udhr_data.get("loc"))
             self.name = udhr_data.get("n")
-            print(self.key, self.name)
+            self.title = None
+            self.preamble = None
+            self.articles = ()
 
         def Parse(self, translation_data):
             if translation_data is None or self.stage < 2:
                 return
 
+            Article = UdhrTranslations.Article
             self.title = None
             if translation_data.find("./{*}title") is not None:
                 self.title = translation_data.find("./{*}title").text
@@ -92,28 +150,25 @@ class UdhrTranslations:
             self.preamble = None
             if preamble_data is not None:
                 if preamble_data.find("./{*}title") is not None:
-                    self.preamble = {
-                        "title": preamble_data.find("./{*}title").text,
-                        "content": [
-                            para.text for para in preamble_data.findall("./{*}para")
-                        ],
-                    }
-
-            articles_data = translation_data.findall("./{*}article")
-            self.articles = []
-            for article_data in articles_data:
+                    self.preamble = Article(
+                        0,
+                        preamble_data.find("./{*}title").text,
+                        tuple(para.text for para in preamble_data.findall("./{*}para")),
+                    )
+
+            articles = []
+            for article_data in translation_data.findall("./{*}article"):
                 try:
                     title = article_data.find("./{*}title").text
                 except AttributeError:
                     title = ""
-                article = {
-                    "id": int(article_data.get("number")),
-                    "title": title,
-                    "content": [
-                        para.text for para in article_data.findall("./{*}para")
-                    ],
-                }
-                self.articles.append(article)
+                article = Article(
+                    int(article_data.get("number")),
+                    title,
+                    tuple(para.text for para in article_data.findall("./{*}para")),
+                )
+                articles.append(article)
+            self.articles = tuple(articles)
 
         def GetSampleTexts(self):
             extractor = SampleTextExtractor(udhr)
@@ -251,52 +306,44 @@ import notodata.db as db
 from yaplon import writer
 
 
+def art1_record(u):
+    """Returns (Article 1 text, record) for the Udhr u, or None if it has
+    no Article 1."""
+    content = None
+    for article in u.articles:
+        if article.id == 1 and article.content:
+            content = " ".join(article.content)
+    if not content:
+        return None
+    langcode = langcodes.standardize_tag(u.iso639_3.replace("twi", "aka"))
+    llang = langcodes.Language.make(language=langcode, script=u.iso15924)
+    llang = llang.maximize()
+    if llang.territory:
+        code = f"{llang.language}-{llang.script}-{llang.territory}"
+    else:
+        code = f"{llang.language}-{llang.script}"
+    rec = db.lang_name_lookup.get(code)
+    if rec:
+        code = db.langs_list[rec]["full"]
+    d = OrderedDict()
+    d["lang"] = u.bcp47.split("-")[0]
+    d["lang_639_3"] = u.iso639_3
+    d["lang_full"] = code
+    d["lang_bcp_udhr"] = u.bcp47
+    d["name_udhr"] = u.name
+    d["script"] = u.iso15924
+    d["source"] = SOURCE
+    d["udhr_key"] = u.key
+    return content, d
+
+
 def main():
     udhrs = UdhrTranslations()
-    udhrs_scripts = OrderedDict()
-    for u in udhrs._udhrs:
-        langcode = langcodes.standardize_tag(u.iso639_3.replace("twi", "aka"))
-        llang = langcodes.Language.make(language=langcode, script=u.iso15924)
-        llang = llang.maximize()
-        if llang.territory:
-            code = f"{llang.language}-{llang.script}-{llang.territory}"
-        else:
-            code = f"{llang.language}-{llang.script}"
-        rec = db.lang_name_lookup.get(code)
-        if rec:
-            code = db.langs_list[rec]["full"]
-        udhrs_scripts[u.key] = {
-            "lang_full": code,
-            "name_udhr": u.name,
-            "lang": u.bcp47.split("-")[0],
-            "lang_bcp_udhr": u.bcp47,
-            "lang_639_3": u.iso639_3,
-            "script": u.iso15924,
-        }
-        content = None
-        if "articles" in vars(u).keys():
-            for article in u.articles:
-                art1 = article.get("id", "")
-                if art1 == 1:
-                    content = article.get("content", None)
-                    if content:
-                        content = " ".join(article["content"])
-        if content:
-            udhrs_scripts[u.key]["art1"] = content
-
     udhr_art1 = OrderedDict()
-    for udhr_code, rec in udhrs_scripts.items():
-        if "art1" in rec.keys():
-            udhr_art1[rec["art1"]] = OrderedDict()
-            d = udhr_art1[rec["art1"]]
-            d["lang"] = rec["lang"]
-            d["lang_639_3"] = rec["lang_639_3"]
-            d["lang_full"] = rec["lang_full"]
-            d["lang_bcp_udhr"] = rec["lang_bcp_udhr"]
-            d["name_udhr"] = rec["name_udhr"]
-            d["script"] = rec["script"]
-            d["source"] = SOURCE
-            d["udhr_key"] = udhr_code
+    for u in udhrs._udhrs:
+        found = art1_record(u)
+        if found:
+            udhr_art1[found[0]] = found[1]
 
     with open(outpath, "w", encoding="utf-8") as f:
         writer.yaml(udhr_art1, f)
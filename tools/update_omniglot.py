@@ -4,12 +4,16 @@
 __version__ = "0.0.1"
 
 from collections import OrderedDict
+from pathlib import Path
 
 import notodata.db as db
 
 from yaplon import reader, writer
 
-with open("udhr-omniglot.yaml", encoding="utf-8") as f:
+inpath = Path(Path(__file__).parent, "udhr-omniglot.yaml")
+outpath = Path(Path(__file__).parent, "udhr-omniglot-codes.yaml")
+
+with open(inpath, encoding="utf-8") as f:
     udhrs_omni = reader.yaml(f)
 udhrs = OrderedDict()
 
@@ -37,5 +41,5 @@ for k, v in udhrs_omni.items():
     else:
         udhrs["_ " + k] = v
 
-with open("udhr-omniglot-codes.yaml", "w", encoding="utf-8") as f:
+with open(outpath, "w", encoding="utf-8") as f:
     writer.yaml(udhrs, f, mini=False)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Validates the corpus documents against the RelaxNG schema.
+
+The schema `data/udhr/schema.rng` is compiled once per worker process and the
+documents are validated in parallel. A file whose content hash already passed
+under the current schema hash is skipped; the hashes are kept in
+`build/validate_cache.json`. Errors are printed as `path:line:column: message`
+and the exit status is 1 if any document fails, so the tool can be used as a
+pre-commit hook:
+
+    python validate_udhr.py                  # all of data/udhr*, data/udhr-*
+    python validate_udhr.py FILE...          # only these files
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import CORPUS_FOLDERS, data_folder
+
+schema_path = Path(data_folder, "udhr", "schema.rng")
+cache_path = Path(Path(__file__).parent, "..", "build", "validate_cache.json")
+
+_schema = None
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def corpus_files():
+    files = []
+    for folder in CORPUS_FOLDERS:
+        files += sorted(Path(data_folder, folder).glob("udhr_*.xml"))
+    return files
+
+
+def _init_worker(path):
+    global _schema
+    _schema = etree.RelaxNG(etree.parse(str(path)))
+
+
+def validate_file(path):
+    """Returns the list of (line, column, message) errors of one document,
+    validated against the schema compiled in this worker."""
+    try:
+        doc = etree.parse(str(path))
+    except etree.XMLSyntaxError as e:
+        return [(e.lineno, e.offset, e.msg)]
+    if _schema.validate(doc):
+        return []
+    return [(err.line, err.column, err.message) for err in _schema.error_log]
+
+
+def _validate(item):
+    path, digest = item
+    return str(path), digest, validate_file(path)
+
+
+class UdhrValidator:
+    def __init__(self, schema=schema_path, cache=cache_path):
+        self.schema = Path(schema)
+        self.cache_path = Path(cache)
+        self.schema_hash = file_hash(self.schema)
+        self.passed = {}
+        if self.cache_path.exists():
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("schema") == self.schema_hash:
+                self.passed = data.get("passed", {})
+
+    def save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"schema": self.schema_hash, "passed": self.passed}, f, indent=0)
+
+    def validate(self, paths, workers=None):
+        """Returns {path: [(line, column, message)]} for the documents that
+        fail, skipping those that passed before with the same content."""
+        todo = []
+        for path in paths:
+            key = str(Path(path).resolve())
+            digest = file_hash(path)
+            if self.passed.get(key) != digest:
+                todo.append((path, digest))
+        failed = {}
+        if todo:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(str(self.schema),),
+            ) as pool:
+                for path, digest, errors in pool.map(_validate, todo, chunksize=8):
+                    key = str(Path(path).resolve())
+                    if errors:
+                        failed[path] = errors
+                        self.passed.pop(key, None)
+                    else:
+                        self.passed[key] = digest
+        self.save()
+        return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("-s", "--schema", default=str(schema_path))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("files", nargs="*")
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.files] or corpus_files()
+    validator = UdhrValidator(args.schema)
+    if args.no_cache:
+        validator.passed = {}
+    failed = validator.validate(paths, args.jobs)
+    for path, errors in sorted(failed.items()):
+        for line, column, message in errors:
+            print(f"{os.path.relpath(path)}:{line}:{column}: {message}")
+    if failed:
+        print(f"{len(failed)} of {len(paths)} documents are invalid", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""Watches the curated sources and patches the files derived from them.
+
+The tool polls the files of `RULES` for changes to their mtime or size.
+Changes are collected by a background worker and handled together once no
+change arrived for `DEBOUNCE` seconds, so saving several files at once
+gives one update. Only the parts derived from the changed files are
+rewritten:
+
+*   an edited `data/udhr-manual/udhr_KEY.xml` updates its row in
+    `data/udhr-manual/index.xml` (as `make_index_xml.py` writes it, but
+    keeping the `CURATED` attributes of the existing row) and its
+    record in `udhr_art1_r12a.yaml` (as `update_from_official_udhr.py`
+    writes it); a deleted one removes both;
+*   an edited source document of `aksharamukha_transliterate.py`,
+    `gimeltra_transliterate.py` or `wiktra_transliterate.py` is transliterated
+    again, and its rows in the index of that tool are replaced;
+*   an edited `aksharamukha-scripts.yml` transliterates only the scripts
+    whose entries changed, and removes the outputs of removed scripts.
+
+The transliterators are created once, when the watcher starts, and kept
+for its lifetime, so an update does not pay for loading their data again.
+Stop the watcher with Ctrl+C.
+
+    python watch_corpus.py
+"""
+
+import argparse
+import copy
+import fnmatch
+import importlib
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+
+from lxml import etree
+
+from udhr_corpus import canonical_path
+from yaplon import reader, writer
+
+repo_folder = Path(Path(__file__).parent, "..").resolve()
+manual_folder = Path(repo_folder, "data", "udhr-manual")
+translit_folder = Path(repo_folder, "data", "udhr-translit")
+
+POLL = 0.2
+DEBOUNCE = 0.3
+
+RULES = [
+    ("data/udhr-manual/udhr_*.xml", "manual_doc"),
+    ("data/udhr/udhr_*.xml", "translit_source"),
+    ("tools/aksharamukha-scripts.yml", "aksharamukha_scripts"),
+]
+
+# Transliteration tools: module, index file and the argument tuple that
+# convert_doc() of the tool takes after the file name.
+BACKENDS = OrderedDict(
+    aksharamukha=(
+        "aksharamukha_transliterate",
+        "index_aksharamukha.xml",
+        lambda v: (v["parent"], v["aks"], v.get("to", None)),
+    ),
+    gimeltra=(
+        "gimeltra_transliterate",
+        "index_gimeltra.xml",
+        lambda v: (v["script"],),
+    ),
+    wiktra=(
+        "wiktra_transliterate",
+        "index_wiktra.xml",
+        lambda v: (v["lang"], v["script"]),
+    ),
+)
+
+KEY_RE = re.compile(r"<udhr f='([^']*)'")
+# Attributes of `data/udhr-manual/index.xml` rows curated by hand, which an
+# update keeps.
+CURATED = ["ohchr", "stage", "notes", "loc", "demo"]
+
+
+def scan(rules=RULES):
+    """Returns {relative path: (mtime, size)} of the files matched by
+    rules."""
+    files = {}
+    for pattern, _ in rules:
+        for path in repo_folder.glob(pattern):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files[path.relative_to(repo_folder).as_posix()] = (
+                st.st_mtime_ns,
+                st.st_size,
+            )
+    return files
+
+
+def changed_files(old, new):
+    return {rel for rel in old.keys() | new.keys() if old.get(rel) != new.get(rel)}
+
+
+class IndexFile:
+    """An `index.xml` file whose `<udhr>` rows, one per line, are replaced,
+    added or removed by key."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def row_pattern(self, key):
+        return re.compile(rf"^[ \t]*<udhr f='{re.escape(key)}'[^\n]*/>[ \t]*\n?", re.M)
+
+    def row(self, key):
+        """Returns the attributes of the row of key, or None."""
+        if not self.path.exists():
+            return None
+        m = self.row_pattern(key).search(self.path.read_text(encoding="utf-8"))
+        return dict(etree.fromstring(m.group(0).strip()).attrib) if m else None
+
+    def patch(self, records):
+        """Applies {key: row text or None to remove} and returns the list of
+        keys whose row changed."""
+        if self.path.exists():
+            text = self.path.read_text(encoding="utf-8")
+        else:
+            text = '<?xml version="1.0" encoding="UTF-8"?>\n\n<udhrs>\n</udhrs>'
+        changed = []
+        for key, rec in records.items():
+            row = self.row_pattern(key)
+            new = "" if rec is None else "  " + rec.strip() + "\n"
+            if row.search(text):
+                patched = row.sub(lambda m: new, text, count=1)
+            elif rec is not None:
+                end = text.rindex("</udhrs>")
+                patched = text[:end] + new + text[end:]
+            else:
+                continue
+            if patched != text:
+                changed.append(key)
+                text = patched
+        if changed:
+            self.path.write_text(text, encoding="utf-8")
+        return changed
+
+
+def patch_art1(path, key, found):
+    """Replaces the record of key in the text-keyed YAML file at path with
+    found, a (text, record) pair or None. Returns True if the file
+    changed."""
+    with open(path, encoding="utf-8") as f:
+        records = reader.yaml(f)
+    patched = OrderedDict()
+    for text, rec in records.items():
+        if rec.get("udhr_key") != key:
+            patched[text] = rec
+        elif found:
+            patched[found[0]] = found[1]
+            found = None
+    if found:
+        patched[found[0]] = found[1]
+    if list(patched.items()) == list(records.items()):
+        return False
+    with open(path, "w", encoding="utf-8") as f:
+        writer.yaml(patched, f)
+    return True
+
+
+class CorpusPatcher:
+    def __init__(self, log=print):
+        self.log = log
+        self.backends = {}
+
+    def handle(self, paths):
+        """Patches the files derived from paths, relative to the
+        repository."""
+        start = time.perf_counter()
+        for rel in sorted(paths):
+            for pattern, method in RULES:
+                if fnmatch.fnmatchcase(rel, pattern):
+                    try:
+                        getattr(self, method)(rel)
+                    except Exception:
+                        self.log(f"{rel}: failed\n{traceback.format_exc()}")
+                    break
+        self.log(
+            f"{len(paths)} changed files done in {time.perf_counter() - start:.2f}s"
+        )
+
+    def manual_doc(self, rel):
+        from make_index_xml import index_record
+        import update_from_official_udhr as official
+
+        path = Path(repo_folder, rel)
+        index = IndexFile(Path(manual_folder, "index.xml"))
+        key = path.stem[len("udhr_") :]
+        found = None
+        rec = None
+        if path.exists():
+            tree = etree.parse(str(canonical_path(path)))
+            at = tree.getroot().attrib
+            key = at["key"]
+            rec = index_record(at)
+            for name, value in (index.row(key) or {}).items():
+                if name in CURATED:
+                    rec = re.sub(rf"\b{name}='[^']*'", f"{name}='{value}'", rec)
+            udhr = official.UdhrTranslations.Udhr(
+                etree.fromstring(rec.strip()), official.udhr_folder
+            )
+            udhr.Parse(tree)
+            found = official.art1_record(udhr)
+        changed = index.patch({key: rec})
+        if changed:
+            self.log(f"{rel}: index.xml row {key}")
+        if patch_art1(official.outpath, key, found):
+            self.log(f"{rel}: {Path(official.outpath).name} record {key}")
+
+    def warm(self):
+        """Creates the transliterators that can be loaded."""
+        for name in BACKENDS:
+            try:
+                self.backend(name)
+            except ImportError as e:
+                self.log(f"{name} not available ({e})")
+
+    def backend(self, name):
+        """Returns (module, warm transliterator) of a backend, created on
+        first use."""
+        if name not in self.backends:
+            module = importlib.import_module(BACKENDS[name][0])
+            if name == "wiktra":
+                languages = sorted(
+                    {(v["lang"], v["script"]) for v in module.in_docs.values()}
+                )
+                module.init_worker(languages)
+                tr = None
+            else:
+                tr = module.UDHRTransliterator()
+            self.backends[name] = (module, tr)
+        return self.backends[name]
+
+    def convert(self, name, file_name, to_akss=None):
+        """Transliterates one source document with a backend and returns
+        {key: index row}."""
+        args = BACKENDS[name][2]
+        module, tr = self.backend(name)
+        doc = module.in_docs[file_name]
+        if name == "wiktra":
+            _, rec, error = module.convert_doc((file_name, *args(doc)))
+            if error:
+                raise ValueError(error)
+            recs = [rec]
+        else:
+            tr.index = []
+            if to_akss is not None:
+                wanted = [k for k in to_akss if k in (doc.get("to") or to_akss)]
+                if not wanted:
+                    return {}
+                tr.convert_doc(file_name, doc["parent"], doc["aks"], wanted)
+            else:
+                tr.convert_doc(file_name, *args(doc))
+            recs = tr.index
+        return {KEY_RE.search(rec).group(1): rec for rec in recs}
+
+    def patch_index(self, name, rel, records):
+        index_name = BACKENDS[name][1]
+        changed = IndexFile(Path(translit_folder, index_name)).patch(records)
+        self.log(
+            f"{rel}: {len(records)} documents, {len(changed)} rows of {index_name}"
+        )
+
+    def translit_source(self, rel):
+        file_name = Path(rel).name
+        if not Path(repo_folder, rel).exists():
+            return
+        for name, (module_name, _, _) in BACKENDS.items():
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                self.log(f"{rel}: {name} not available ({e})")
+                continue
+            if file_name in module.in_docs:
+                self.patch_index(name, rel, self.convert(name, file_name))
+
+    def aksharamukha_scripts(self, rel):
+        fresh = "aksharamukha" not in self.backends
+        module, tr = self.backend("aksharamukha")
+        old = {} if fresh else copy.deepcopy(tr.ak_scripts)
+        tr.ak_scripts = OrderedDict()
+        tr.init_ak()
+        new = tr.ak_scripts
+        changed = [k for k, v in new.items() if old.get(k) != v and not v.get("skip")]
+        removed = [
+            k
+            for k, v in old.items()
+            if not v.get("skip") and (k not in new or new[k].get("skip"))
+        ]
+        if not changed and not removed:
+            return
+        records = {}
+        for file_name in module.in_docs:
+            if changed:
+                records.update(self.convert("aksharamukha", file_name, changed))
+            if removed:
+                tr.open(file_name)
+            for k in removed:
+                ak = old[k]
+                suffix = f"_{ak['lang']}" if ak.get("lang") else ""
+                key = f"{tr.lang}_{ak['script'].lower()}{suffix}"
+                Path(module.out_folder, f"udhr_{key}.xml").unlink(missing_ok=True)
+                records[key] = None
+        self.patch_index("aksharamukha", rel, records)
+
+
+class Watcher:
+    """Polls the files of RULES and hands debounced batches of changed files
+    to a CorpusPatcher running in a background thread."""
+
+    def __init__(self, patcher, poll=POLL, debounce=DEBOUNCE):
+        self.patcher = patcher
+        self.poll = poll
+        self.debounce = debounce
+        self.queue = queue.Queue()
+        self.files = scan()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+
+    def work(self):
+        pending = set()
+        while True:
+            try:
+                pending |= self.queue.get(timeout=self.debounce if pending else None)
+            except queue.Empty:
+                batch, pending = pending, set()
+                self.patcher.handle(batch)
+
+    def run(self):
+        self.worker.start()
+        while True:
+            time.sleep(self.poll)
+            files = scan()
+            changed = changed_files(self.files, files)
+            self.files = files
+            if changed:
+                self.queue.put(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poll", type=float, default=POLL, help="seconds")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="seconds")
+    args = parser.parse_args()
+
+    patcher = CorpusPatcher()
+    patcher.warm()
+    watcher = Watcher(patcher, args.poll, args.debounce)
+    print(f"Watching {len(watcher.files)} files", file=sys.stderr)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Romanizes corpus documents with the Wiktionary modules of wiktra.
+
+Each document of `in_docs` becomes a Latin-script companion in
+`data/udhr-translit/udhr_KEY_latn.xml`, listed in `index_wiktra.xml`.
+wiktra runs the Lua transliteration modules of Wiktionary in a lupa
+runtime, and loading a module is far slower than running it. So every
+worker process of the pool keeps one `Transliterator`, created once and
+warmed up with a call per language, so the Lua modules stay loaded, and a
+document is sent as one batched call: the texts of all its elements are
+joined with `SEPARATOR` and split again. If a module does not keep the
+separators, that document falls back to one call per text.
+
+    python wiktra_transliterate.py
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lupa import LuaError
+from lxml import etree
+from wiktra.Wiktra import Transliterator
+
+from udhr_corpus import canonical_path
+
+in_folder = Path(Path(__file__).parent, "..", "data", "udhr")
+out_folder = Path(Path(__file__).parent, "..", "data", "udhr-translit")
+
+SEPARATOR = "\n\n"
+TO_SCRIPT = "Latn"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Source documents with their Wiktionary language code and script.
+in_docs = {
+    "udhr_rus.xml": {"lang": "ru", "script": "Cyrl"},
+    "udhr_ukr.xml": {"lang": "uk", "script": "Cyrl"},
+    "udhr_bel.xml": {"lang": "be", "script": "Cyrl"},
+    "udhr_bul.xml": {"lang": "bg", "script": "Cyrl"},
+    "udhr_mkd.xml": {"lang": "mk", "script": "Cyrl"},
+    "udhr_kaz.xml": {"lang": "kk", "script": "Cyrl"},
+    "udhr_kir.xml": {"lang": "ky", "script": "Cyrl"},
+    "udhr_tgk.xml": {"lang": "tg", "script": "Cyrl"},
+    "udhr_ell_monotonic.xml": {"lang": "el", "script": "Grek"},
+    "udhr_hye.xml": {"lang": "hy", "script": "Armn"},
+    "udhr_kat.xml": {"lang": "ka", "script": "Geor"},
+    "udhr_ydd.xml": {"lang": "yi", "script": "Hebr"},
+    "udhr_hin.xml": {"lang": "hi", "script": "Deva"},
+    "udhr_ben.xml": {"lang": "bn", "script": "Beng"},
+    "udhr_pan.xml": {"lang": "pa", "script": "Guru"},
+    "udhr_guj.xml": {"lang": "gu", "script": "Gujr"},
+    "udhr_tam.xml": {"lang": "ta", "script": "Taml"},
+    "udhr_tel.xml": {"lang": "te", "script": "Telu"},
+    "udhr_kan.xml": {"lang": "kn", "script": "Knda"},
+    "udhr_mal.xml": {"lang": "ml", "script": "Mlym"},
+    "udhr_sin.xml": {"lang": "si", "script": "Sinh"},
+    "udhr_tha.xml": {"lang": "th", "script": "Thai"},
+    "udhr_lao.xml": {"lang": "lo", "script": "Laoo"},
+    "udhr_khm.xml": {"lang": "km", "script": "Khmr"},
+    "udhr_mya.xml": {"lang": "my", "script": "Mymr"},
+    "udhr_bod.xml": {"lang": "bo", "script": "Tibt"},
+    "udhr_amh.xml": {"lang": "am", "script": "Ethi"},
+    "udhr_kor.xml": {"lang": "ko", "script": "Kore"},
+}
+
+_tr = None
+
+
+def init_worker(languages):
+    """Pool initializer: creates the worker's Transliterator and loads the
+    Lua modules of languages, a list of (lang, script)."""
+    global _tr
+    _tr = Transliterator()
+    for lang, script in languages:
+        try:
+            _tr.tr(" ", sc=script, to_sc=TO_SCRIPT, lang=lang)
+        except LuaError:
+            pass
+
+
+def transliterate_texts(texts, lang, script):
+    """Returns the romanizations of texts, in one call if the separators
+    survive and one call per text otherwise."""
+    kwargs = dict(sc=script, to_sc=TO_SCRIPT, lang=lang)
+    try:
+        out = _tr.tr(SEPARATOR.join(texts), **kwargs).split(SEPARATOR)
+    except LuaError:
+        out = []
+    if len(out) != len(texts):
+        out = [_tr.tr(text, **kwargs) for text in texts]
+    return out
+
+
+def index_record(key, iso639, bcp47, name):
+    return f"""
+  <udhr f='{key}'                iso639-3='{iso639}' iso15924='{TO_SCRIPT}'  bcp47='{bcp47}'            dir='ltr' ohchr=''        stage='4' notes='n' loc=''       demo='y' n='{name}'/>
+        """
+
+
+def convert_doc(job):
+    """Worker: romanizes one document; job is (in file name, lang, script).
+    Returns (in file name, index record or None, error or None)."""
+    in_file_name, lang, script = job
+    parser = etree.XMLParser(ns_clean=True)
+    try:
+        with open(canonical_path(Path(in_folder, in_file_name)), "rb") as f:
+            tree = etree.parse(f, parser)
+    except (OSError, etree.XMLSyntaxError) as e:
+        return in_file_name, None, str(e)
+    root = tree.getroot()
+    elements = [el for el in root.iter() if el.text and el.text.strip()]
+    try:
+        texts = transliterate_texts([el.text.strip() for el in elements], lang, script)
+    except LuaError as e:
+        return in_file_name, None, str(e)
+    for el, text in zip(elements, texts):
+        el.text = text
+
+    iso639 = root.attrib.get("iso639-3", "")
+    key = f"{root.attrib['key']}_{TO_SCRIPT.lower()}"
+    bcp47 = f"{root.attrib[XML_LANG].split('-')[0]}-{TO_SCRIPT}"
+    lang_name = root.attrib["n"].split("(")[0].strip()
+    name = f"{lang_name} (Latin, Wiktionary romanization)"
+    root.attrib[XML_LANG] = bcp47
+    root.attrib["key"] = key
+    root.attrib["n"] = name
+    root.attrib["dir"] = "ltr"
+    root.attrib["iso15924"] = TO_SCRIPT
+    tree.write(
+        str(Path(out_folder, f"udhr_{key}.xml")),
+        encoding="utf-8",
+        xml_declaration=True,
+        pretty_print=True,
+    )
+    return in_file_name, index_record(key, iso639, bcp47, name), None
+
+
+def convert_docs(docs=in_docs, workers=None):
+    """Romanizes docs in a process pool and writes `index_wiktra.xml`.
+    Returns the list of (in file name, error)."""
+    languages = sorted({(v["lang"], v["script"]) for v in docs.values()})
+    jobs = [(k, v["lang"], v["script"]) for k, v in docs.items()]
+    index = {}
+    errors = []
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(languages,)
+    ) as pool:
+        for in_file_name, rec, error in pool.map(convert_doc, jobs):
+            if error:
+                errors.append((in_file_name, error))
+            else:
+                index[in_file_name] = rec
+    indexes_txt = "\n".join(index[k] for k in docs if k in index)
+    index_txt = f"""<?xml version="1.0" encoding="UTF-8"?>
+
+<udhrs>
+{indexes_txt}
+</udhrs>"""
+    with open(Path(out_folder, "index_wiktra.xml"), "w", encoding="utf-8") as f:
+        f.write(index_txt)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    for in_file_name, error in convert_docs(in_docs, args.jobs):
+        print(f"Skipping {in_file_name}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()